@@ -18,9 +18,156 @@ from shiny import App, Inputs, Outputs, Session, reactive, render, ui
 from matplotlib.pyplot import figure, subplots, colorbar
 from matplotlib.colors import Normalize
 from scipy.cluster import hierarchy
+from scipy.spatial.distance import pdist, cdist
 from pandas import DataFrame
+from numpy import add, argsort, array, bincount, concatenate, float64, nonzero, zeros, array_split, arange
+from numpy.random import default_rng
+from asyncio import gather
+
+from shared import Table, Cache, NavBar, FileSelection, Store, Raster, RasterThreshold, Pyramid, Patch, GlobalMetrics, Pool
+
+# The example files, and their display names.
+Examples = {"example1.txt": "Example 1", "example2.txt": "Example 2", "example3.txt": "Example 3"}
+
+# The columns that label rows, rather than hold data.
+Names = ["NAME", "ORF", "UNIQID"]
+
+
+def MiniBatchKMeans(data, k, batch = 1024, iterations = 100, block = 4096):
+	"""
+	@brief Clusters observations into k centroids with mini-batch k-means.
+	@param data: The observations, one per row.
+	@param k: The amount of centroids.
+	@param batch: The amount of observations sampled each iteration.
+	@param iterations: The amount of iterations.
+	@param block: The amount of observations assigned at once, which bounds memory.
+	@returns The centroids, and the index of the centroid each observation belongs to.
+	"""
+	generator = default_rng(0)
+	centroids = array(data[generator.choice(len(data), k, replace=False)], dtype=float64)
+	counts = zeros(k)
+
+	for _ in range(iterations):
+		sample = data[generator.choice(len(data), min(batch, len(data)), replace=False)]
+		nearest = cdist(sample, centroids, "sqeuclidean").argmin(axis=1)
+
+		# Each centroid moves towards the mean of its assigned samples, with a decaying learning rate.
+		sums = zeros(centroids.shape)
+		add.at(sums, nearest, sample)
+		assigned = bincount(nearest, minlength=k)
+		counts += assigned
+		moved = assigned > 0
+		centroids[moved] += (sums[moved] - assigned[moved, None] * centroids[moved]) / counts[moved, None]
+
+	labels = concatenate([cdist(data[i:i + block], centroids, "sqeuclidean").argmin(axis=1) for i in range(0, len(data), block)])
+	return centroids, labels
+
+
+def ApproximateLinkage(data, k, method, metric):
+	"""
+	@brief Approximates hierarchical clustering for more observations than a distance matrix can hold.
+	@param data: The observations, one per row.
+	@param k: The amount of centroids to reduce the observations to.
+	@param method: The linkage method.
+	@param metric: The distance metric.
+	@returns A linkage matrix over every observation, as hierarchy.linkage would return.
+	@info The observations are reduced to k centroids with mini-batch k-means, which are then clustered exactly.
+		Each centroid is then expanded into the exact clustering of its members (Approximated again if it has
+		more than k), and heights are raised where needed to keep the tree monotonic. Memory is O(k²) rather
+		than O(n²), at the cost of the top of the tree being built from centroids, in Euclidean k-means space,
+		rather than from the observations themselves.
+	"""
+	n = len(data)
+	if n <= k: return hierarchy.linkage(pdist(data, metric=metric), method=method) if n > 1 else zeros((0, 4))
+
+	_, labels = MiniBatchKMeans(data, k)
+	clusters = [nonzero(labels == c)[0] for c in range(k)]
+	clusters = [members for members in clusters if len(members)]
+
+	# If k-means could not separate the observations (Such as duplicates), split them arbitrarily.
+	if len(clusters) == 1: clusters = array_split(arange(n), k)
+
+	rows, nodes, heights, following = [], [], [], n
+	for members in clusters:
+		if len(members) == 1: nodes.append(members[0]); heights.append(0); continue
+
+		# Cluster the members, and renumber their nodes into our tree.
+		sub = ApproximateLinkage(data[members], k, method, metric)
+		for a, b, height, count in sub:
+			a, b = (members[int(x)] if x < len(members) else following + int(x) - len(members) for x in (a, b))
+			rows.append([a, b, height, count])
+		following += len(members) - 1
+		nodes.append(following - 1)
+		heights.append(sub[-1, 2])
+
+	# Join the clusters by the exact clustering of their centroids.
+	centroids = array([data[members].mean(axis=0) for members in clusters], dtype=float64)
+	counts = [len(members) for members in clusters]
+	for a, b, height, _ in hierarchy.linkage(pdist(centroids, metric=metric), method=method):
+		a, b = int(a), int(b)
+		height = max(height, heights[a], heights[b])
+		rows.append([nodes[a], nodes[b], height, counts[a] + counts[b]])
+		nodes.append(following); heights.append(height); counts.append(counts[a] + counts[b])
+		following += 1
+
+	# Order the merges by height, as linkage does, renumbering the nodes to match. Centroid and Median can merge
+	# below their children, so each is ordered by the highest merge beneath it, which keeps children first.
+	rows = array(rows, dtype=float64)
+	ceiling = rows[:, 2].copy()
+	for i, (a, b) in enumerate(rows[:, :2].astype(int)):
+		ceiling[i] = max([ceiling[i]] + [ceiling[x - n] for x in (a, b) if x >= n])
+	order = argsort(ceiling, kind="stable")
+	renumber = concatenate([arange(n), zeros(n - 1, dtype=int)])
+	renumber[n + order] = n + arange(n - 1)
+	rows = rows[order]
+	rows[:, :2] = renumber[rows[:, :2].astype(int)]
+	return rows
+
+
+def Subtree(matrix, node):
+	"""
+	@brief Extracts the subtree below a node of a dendrogram.
+	@param matrix: A linkage matrix.
+	@param node: The node, as numbered by linkage: leaves are below len(matrix) + 1, and merges above.
+	@returns A linkage matrix of the subtree, and the leaves it holds, in the order the dendrogram draws them.
+	"""
+	n = len(matrix) + 1
+	leaves, merges, stack = [], [], [node]
+	while stack:
+		x = stack.pop()
+		if x < n: leaves.append(x)
+		else: merges.append(x); stack.extend((int(matrix[x - n, 1]), int(matrix[x - n, 0])))
+
+	# Renumber the nodes, keeping the merges in their order, such that children still precede their parents.
+	merges.sort()
+	ids = {x: i for i, x in enumerate(leaves)} | {x: len(leaves) + i for i, x in enumerate(merges)}
+	subtree = matrix[[x - n for x in merges]].copy()
+	for row in subtree: row[0], row[1] = ids[int(row[0])], ids[int(row[1])]
+	return subtree, leaves
+
+
+def Collapse(matrix, k):
+	"""
+	@brief Collapses a dendrogram to its top k clusters, as dendrogram's truncate_mode="lastp" draws it.
+	@param matrix: A linkage matrix.
+	@param k: The amount of clusters, at least 2.
+	@returns A linkage matrix over the clusters, and the node each of its leaves stands for.
+	@info The top k - 1 merges are the last rows of the matrix, and their children that are not themselves
+		among them are the clusters.
+	"""
+	n = len(matrix) + 1
+	cut = 2 * n - k
+	top = matrix[n - k:].copy()
+	nodes = [int(x) for x in top[:, :2].ravel() if x < cut]
+	ids = {x: i for i, x in enumerate(nodes)}
+	top[:, :2] = [[ids[int(x)] if x < cut else int(x) - cut + k for x in row] for row in top[:, :2]]
+
+	# Each cluster is now a single leaf.
+	counts = [1] * k
+	for a, b, _, _ in top: counts.append(counts[int(a)] + counts[int(b)])
+	top[:, 3] = counts[k:]
+	return top, nodes
 
-from shared import Table, Cache, NavBar, FileSelection
 
 def server(input: Inputs, output: Outputs, session: Session):
 	# Information about the Examples
@@ -30,7 +177,26 @@ def server(input: Inputs, output: Outputs, session: Session):
 		"example3.txt": "This example dataset is retrieved from the online supplement to Eisen et al. (1998), which is a very well known paper about cluster analysis and visualization. The details of how the data was collected are outlined in the paper."
 	}
 
-	DataCache = Cache("expression")
+	DataCache = Cache("expression", Cache.LeanHandler())
+	DataCache.Warm(session, Examples)
+
+	# Condensed distance matrices, keyed by the dataset version, axis, and distance method.
+	Distances = Store()
+
+	# The latest version whose distances were computed, keyed by the dataset, axis and distance method, such that edits patch them.
+	Latest = {}
+
+	# Linkage matrices, keyed by the dataset version, axis, clustering method, and distance method.
+	Linkages = Store()
+
+	# Pyramids of large heatmaps, keyed by the dataset version, scaling, aggregation, and clustering of each axis.
+	Pyramids = Store()
+
+	# The region of a large heatmap being viewed, as (top, bottom, left, right) in its clustered order, or None for all of it.
+	Window = reactive.Value(None)
+
+	# Where the last large heatmap was drawn in its image, so that brushes can be mapped back onto the matrix.
+	Geometry = {}
 
 
 	async def ProcessData():
@@ -41,32 +207,139 @@ def server(input: Inputs, output: Outputs, session: Session):
 		"""
 		df = await DataCache.Load(input)
 
-		names = ["NAME", "ORF", "UNIQID"]
-
-		for name in names:
+		# Binary matrices need not have a naming column.
+		index_labels = [str(i) for i in range(df.shape[0])]
+		for name in Names:
 			if name in df.columns:
 				index_labels = df[name]
 				break
 
 		# Drop the naming columns before linkage.
-		data = df.drop(columns=[col for col in names if col in df.columns])
-		x_labels = ["X" + name if list(data.columns).count(name) == 1 else "X" + name + f".{i+1}" for i, name in enumerate(data.columns)]
+		data = df.drop(columns=[col for col in Names if col in df.columns])
+		x_labels = ["X" + str(name) if list(data.columns).count(name) == 1 else "X" + str(name) + f".{i+1}" for i, name in enumerate(data.columns)]
 
 		return list(index_labels), x_labels, data
 
 
-	def GenerateDendrogram(data, ax, orientation, labels = [], invert=False):
+	async def Edited(axis, since):
+		"""
+		@brief Returns which rows or columns of the data have been edited since an earlier version.
+		@param axis: Either "Row" or "Column"
+		@param since: The earlier version, from DataCache.Version()
+		@returns A sorted list of indices into the data returned by ProcessData(), or None if unknown.
+		"""
+		changes = DataCache.Changes(input, since)
+		if changes is None: return None
+
+		# Edits to the naming columns change no distances.
+		df = await DataCache.Load(input)
+		kept = [i for i, name in enumerate(df.columns) if name not in Names]
+		return sorted({row if axis == "Row" else kept.index(column) for row, column in changes if column in kept})
+
+
+	async def Distance(axis):
+		"""
+		@brief Returns the condensed distance matrix of the current dataset, computing it only if this dataset
+			version, axis and distance method have not been seen before.
+		@param axis: Either "Row" or "Column"
+		@returns The condensed distance matrix, as returned by pdist.
+		@info If the distances of an earlier version are cached, and only a few rows or columns have since been
+			edited, only their distances are recomputed, into the earlier matrix.
+		"""
+		version, method = DataCache.Version(input), input.DistanceMethod()
+		key = (version, axis, method)
+		if key not in Distances:
+			_, _, data = await ProcessData()
+			values = data.values.T if axis == "Column" else data.values
+
+			previous = Latest.get((version[0], axis, method))
+			edited = await Edited(axis, previous) if previous is not None and (previous, axis, method) in Distances else None
+
+			if edited is not None and len(edited) * 2 < len(values) and method.lower() not in GlobalMetrics:
+				distances = Distances.pop((previous, axis, method))
+				Patch(distances, values, edited, method.lower())
+			else: distances = await Pool.Distances(values, method.lower())
+
+			Distances[key] = distances
+			Latest[(version[0], axis, method)] = version
+		return Distances[key]
+
+
+	async def Linkage(axis):
+		"""
+		@brief Returns the linkage matrix of the current dataset, computing it only if this dataset version,
+			axis, clustering method and distance method have not been clustered before.
+		@param axis: Either "Row" or "Column"
+		@returns The linkage matrix.
+		@info The linkage is computed from the cached distances, so changing the clustering method does not
+			compute them again. It is run on the Pool, such that the session remains responsive; linkage holds
+			the GIL, so the rows and columns are not clustered in parallel on threads. Copying the distances to a
+			process would cost about as much as clustering them.
+		"""
+		approximate = axis == "Row" and input.ClusterMode() == "Approximate"
+		key = (DataCache.Version(input), axis, input.ClusterMethod(), input.DistanceMethod(), input.Centroids() if approximate else None)
+		if key not in Linkages:
+			method, metric = input.ClusterMethod().lower(), input.DistanceMethod().lower()
+
+			# Centroid, Median and Ward are only defined for Euclidean distances, which linkage assumes it has been given.
+			if method in ("centroid", "median", "ward") and metric != "euclidean":
+				raise ValueError("{} clustering requires the Euclidean distance method.".format(input.ClusterMethod()))
+
+			if approximate:
+				_, _, data = await ProcessData()
+				Linkages[key] = await Pool.Run(ApproximateLinkage, data.values, int(input.Centroids()), method, metric)
+			else: Linkages[key] = await Pool.Run(hierarchy.linkage, await Distance(axis), method=method)
+		return Linkages[key]
+
+
+	def Collapsed(data, labels, matrix):
+		"""
+		@brief Collapses the rows to their top clusters, and expands the one chosen, as set by the user.
+		@param data: The data, from ProcessData()
+		@param labels: The labels of each row.
+		@param matrix: The row linkage matrix, from Linkage()
+		@returns The data, labels and linkage matrix of the rows to draw. Each cluster is a single row holding the
+			mean of its members, labelled by its number and size.
+		"""
+		if input.Collapse() == "None" or input.CollapseValue() is None: return data, labels, matrix
+
+		def Clusters(matrix):
+			n = len(matrix) + 1
+			match input.Collapse():
+				case "Clusters": k = int(input.CollapseValue())
+				case "Height": k = n - int((matrix[:, 2] <= input.CollapseValue()).sum())
+			return max(2, k) if k < n else None
+
+		# Clusters are numbered in the order they are drawn.
+		k, expand = Clusters(matrix), int(input.Expand() or 0)
+		if k is not None and 0 < expand <= k:
+			top, nodes = Collapse(matrix, k)
+			node = nodes[Raster.Order(top)[expand - 1]]
+			if node > len(matrix):
+				matrix, members = Subtree(matrix, node)
+				data, labels = data.iloc[members], [labels[i] for i in members]
+				k = Clusters(matrix)
+
+		if k is None: return data, labels, matrix
+
+		top, nodes = Collapse(matrix, k)
+		groups = [Subtree(matrix, node)[1] for node in nodes]
+		number = {leaf: i + 1 for i, leaf in enumerate(Raster.Order(top))}
+		data = DataFrame([data.iloc[group].mean() for group in groups], columns=data.columns)
+		labels = [labels[group[0]] if len(group) == 1 else "#{} ({})".format(number[i], len(group)) for i, group in enumerate(groups)]
+		return data, labels, top
+
+
+	def GenerateDendrogram(matrix, ax, orientation, labels = []):
 		"""
 		@brief General dendrogram generator.
-		@param data: The DataFrame that contains the data to generate the dendrogram from.
+		@param matrix: The linkage matrix, from Linkage()
 		@param ax: The MatPlotLib Axis to assign tick marks to
 		@param orientation: What orientation we should set the dendrogram to be. Can be "Left", "Right", "Top", or "Bottom"
 		@param labels: An optional list of labels to add the dendrogram, labelling the X axis on Left/Right, and the Y on Top/Bottom
-		@param invert: Whether to invert the DataFrame to generate Columnar dendrograms.
 		@returns The dendrogram, mostly useful to aligning the Heatmap to the new ordering.
 		"""
 
-		matrix = hierarchy.linkage(data.values.T if invert else data.values, method=input.ClusterMethod().lower(), metric=input.DistanceMethod().lower())
 		dendrogram = hierarchy.dendrogram(matrix, ax=ax, orientation=orientation.lower())
 
 		# If there are labels, sort them according to the dendrogram.
@@ -84,6 +357,18 @@ def server(input: Inputs, output: Outputs, session: Session):
 		return dendrogram
 
 
+	def Scale(df):
+		"""
+		@brief Normalizes the data according to input.ScaleType()
+		@param df: The data.
+		@returns The normalized data.
+		"""
+		match input.ScaleType():
+			case "Row": return df.div(df.max(axis=1), axis=0)
+			case "Column": return df.div(df.max(axis=0), axis=1)
+		return df
+
+
 	async def GenerateHeatmap():
 		"""
 		@brief Generates the Heatmap
@@ -92,6 +377,44 @@ def server(input: Inputs, output: Outputs, session: Session):
 
 		index_labels, x_labels, data = await ProcessData()
 
+		# The row and column clusterings are independent, so their distances are computed at the same time.
+		axes = [axis for axis, feature in (("Row", "row"), ("Column", "col")) if feature in input.Features()]
+		linkages = dict(zip(axes, await gather(*(Linkage(axis) for axis in axes))))
+		row_linkage, column_linkage = linkages.get("Row"), linkages.get("Column")
+		if row_linkage is not None: data, index_labels, row_linkage = Collapsed(data, index_labels, row_linkage)
+
+		# Large matrices are drawn directly, as MatPlotLib would take far longer to lay them out than to cluster them.
+		# The clustered matrix is kept as a pyramid, so zooming in only ever draws the region in view.
+		if data.size > RasterThreshold:
+
+			key = (
+				DataCache.Version(input), input.ScaleType(), input.Aggregation(),
+				"row" in input.Features() and (input.ClusterMethod(), input.DistanceMethod(), input.ClusterMode(), input.Centroids()),
+				"col" in input.Features() and (input.ClusterMethod(), input.DistanceMethod()),
+				"row" in input.Features() and (input.Collapse(), input.CollapseValue(), input.Expand()),
+			)
+			if key not in Pyramids:
+				Pyramids[key] = Pyramid(Scale(data), Raster.Order(row_linkage), Raster.Order(column_linkage), input.Aggregation())
+
+			image = Raster.Heatmap(
+				Pyramids[key],
+				input.ColorMap().lower(),
+				rows=index_labels if "y" in input.Features() else None,
+				columns=x_labels if "x" in input.Features() else None,
+				row_linkage=row_linkage,
+				column_linkage=column_linkage,
+				legend="legend" in input.Features(),
+				text=input.TextSize(),
+				window=Window(),
+			)
+
+			# Levels built for this view are now counted against the budget.
+			Pyramids[key] = Pyramids[key]
+			Geometry["Heatmap"] = image.info["Geometry"]
+			return image
+
+		Geometry.clear()
+
 		# Create a figure with a heatmap and associated dendrograms
 		fig = figure(figsize=(12, 10))
 		gs = fig.add_gridspec(4, 2, height_ratios=[2, 8, 1, 1], width_ratios=[2, 8], hspace=0, wspace=0)
@@ -101,7 +424,7 @@ def server(input: Inputs, output: Outputs, session: Session):
 		# To data, so the order changes when turning the toggle.
 		if "row" in input.Features():
 			ax_row = fig.add_subplot(gs[1, 0])
-			row_dendrogram = GenerateDendrogram(data, ax_row, "Left")
+			row_dendrogram = GenerateDendrogram(row_linkage, ax_row, "Left")
 			ax_row.axis("off")
 			index_labels = [index_labels[i] for i in row_dendrogram["leaves"]]
 			df = data.iloc[row_dendrogram["leaves"]]
@@ -111,13 +434,11 @@ def server(input: Inputs, output: Outputs, session: Session):
 		# If we render the column dendrogram.
 		if "col" in input.Features():
 			ax_col = fig.add_subplot(gs[0, 1])
-			col_dendrogram = GenerateDendrogram(data, ax_col, "Top", invert=True)
+			col_dendrogram = GenerateDendrogram(column_linkage, ax_col, "Top")
 			ax_col.axis("off")
 
 		# Handle normalization
-		match input.ScaleType():
-			case "Row": df = df.div(df.max(axis=1), axis=0)
-			case "Column": df = df.div(df.max(axis=0), axis=1)
+		df = Scale(df)
 
 		# Render the heatmap.
 		ax_heatmap = fig.add_subplot(gs[1, 1])
@@ -158,15 +479,31 @@ def server(input: Inputs, output: Outputs, session: Session):
 
 	@output
 	@render.plot
-	@reactive.event(input.Update, input.Reset, input.Example, input.File, input.ClusterMethod, input.DistanceMethod, input.TextSize, input.ScaleType, input.Interpolation, input.ColorMap, input.Features, ignore_none=False, ignore_init=False)
+	@reactive.event(input.Update, input.Reset, input.Example, input.File, input.ClusterMethod, input.DistanceMethod, input.ClusterMode, input.Centroids, input.TextSize, input.ScaleType, input.Interpolation, input.ColorMap, input.Features, input.Aggregation, input.Collapse, input.CollapseValue, input.Expand, Window, ignore_none=False, ignore_init=False)
 	async def Heatmap(): return await GenerateHeatmap()
 
 
+	@reactive.Effect
+	@reactive.event(input.Heatmap_brush)
+	def Zoom():
+		"""
+		@brief Zooms a large heatmap into the brushed region.
+		"""
+		if input.Heatmap_brush() is not None and "Heatmap" in Geometry:
+			Window.set(Raster.Zoom(Geometry["Heatmap"], input.Heatmap_brush()))
+
+
+	@reactive.Effect
+	@reactive.event(input.Heatmap_dblclick, input.Example, input.File, input.Features, input.Collapse, input.CollapseValue, input.Expand)
+	def Unzoom(): Window.set(None)
+
+
 	@output
 	@render.plot
-	@reactive.event(input.Update, input.Reset, input.Example, input.File, input.Orientation, input.ClusterMethod, input.DistanceMethod, input.TextSize, ignore_none=False, ignore_init=False)
+	@reactive.event(input.Update, input.Reset, input.Example, input.File, input.Orientation, input.ClusterMethod, input.DistanceMethod, input.ClusterMode, input.Centroids, input.Collapse, input.CollapseValue, input.Expand, input.TextSize, ignore_none=False, ignore_init=False)
 	async def RowDendrogram():
 		index_labels, _, data = await ProcessData()
+		_, index_labels, matrix = Collapsed(data, index_labels, await Linkage("Row"))
 
 		fig = figure(figsize=(12, 10))
 		ax = fig.add_subplot(111)
@@ -176,7 +513,7 @@ def server(input: Inputs, output: Outputs, session: Session):
 		ax.spines["bottom"].set_visible(False)
 		ax.spines["left"].set_visible(False)
 
-		GenerateDendrogram(data, ax, input.Orientation(), index_labels)
+		GenerateDendrogram(matrix, ax, input.Orientation(), index_labels)
 		return fig
 
 
@@ -184,7 +521,7 @@ def server(input: Inputs, output: Outputs, session: Session):
 	@render.plot
 	@reactive.event(input.Update, input.Reset, input.Example, input.File, input.Orientation, input.ClusterMethod, input.DistanceMethod, input.TextSize, ignore_none=False, ignore_init=False)
 	async def ColumnDendrogram():
-		_, x_labels, data = await ProcessData()
+		_, x_labels, _ = await ProcessData()
 
 		fig = figure(figsize=(12, 10))
 		ax = fig.add_subplot(111)
@@ -194,7 +531,7 @@ def server(input: Inputs, output: Outputs, session: Session):
 		ax.spines["bottom"].set_visible(False)
 		ax.spines["left"].set_visible(False)
 
-		GenerateDendrogram(data, ax, input.Orientation(), x_labels, invert=True)
+		GenerateDendrogram(await Linkage("Column"), ax, input.Orientation(), x_labels)
 		return fig
 
 
@@ -239,13 +576,33 @@ app_ui = ui.page_fluid(
 		ui.sidebar(
 
 			FileSelection(
-				examples={"example1.txt": "Example 1", "example2.txt": "Example 2", "example3.txt": "Example 3"},
-				types=[".csv", ".txt", ".xlsx", ".pdb", ".dat"]
+				examples=Examples,
+				types=[".csv", ".txt", ".xlsx", ".pdb", ".dat", ".parquet", ".feather", ".npy"]
 			),
 
 			# https://docs.scipy.org/doc/scipy/reference/generated/scipy.cluster.hierarchy.linkage.html
 			ui.input_select(id="ClusterMethod", label="Clustering Method", choices=["Single", "Complete", "Average", "Weighted", "Centroid", "Median", "Ward"], selected="Average"),
 
+			# Exact clustering needs a distance matrix quadratic in the rows, which genome-scale matrices cannot afford.
+			# Approximate reduces the rows to a set of centroids with k-means, clusters those exactly, and expands each
+			# back into the exact clustering of its rows: memory follows the centroids, but the top of the tree is built
+			# from centroids rather than rows. More centroids are slower, but closer to Exact.
+			ui.input_select(id="ClusterMode", label="Row Clustering", choices=["Exact", "Approximate"], selected="Exact"),
+			ui.panel_conditional(
+				"input.ClusterMode === 'Approximate'",
+				ui.input_numeric(id="Centroids", label="Centroids", value=1000, min=10, max=10000, step=10),
+			),
+
+			# Trees with thousands of leaves cannot be read, so the rows can be collapsed to the top clusters, either a
+			# number of them or those below a cut height. Each cluster is drawn as a single row holding the mean of its
+			# members, labelled by its number and size. Expanding a cluster by its number draws only its subtree.
+			ui.input_select(id="Collapse", label="Collapse Rows", choices=["None", "Clusters", "Height"], selected="None"),
+			ui.panel_conditional(
+				"input.Collapse !== 'None'",
+				ui.input_numeric(id="CollapseValue", label="Clusters, or Cut Height", value=50, min=0),
+				ui.input_numeric(id="Expand", label="Expand Cluster", value=0, min=0, step=1),
+			),
+
 			# https://docs.scipy.org/doc/scipy/reference/generated/scipy.spatial.distance.pdist.html#scipy.spatial.distance.pdist
 			ui.input_select(id="DistanceMethod", label="Distance Method", choices=["Braycurtis", "Canberra", "Chebyshev", "Cityblock", "Correlation", "Cosine", "Dice", "Euclidean", "Hamming", "Jaccard", "Jensenshannon", "Kulczynski1", "Mahalanobis", "Matching", "Minkowski", "Rogerstanimoto", "Russellrao", "Seuclidean", "Sokalmichener", "Sokalsneath", "Sqeuclidean", "Yule"], selected="Euclidean"),
 
@@ -266,6 +623,10 @@ app_ui = ui.page_fluid(
 				# Set the ColorMap used.
 				ui.input_select(id="ColorMap", label="Color Map", choices=["Viridis", "Plasma", "Inferno", "Magma", "Cividis"], selected="Viridis"),
 
+				# Large heatmaps show more rows than pixels, so each pixel shows either the mean or the max of its block.
+				# Drag over them to zoom in, and double click to zoom back out.
+				ui.input_select(id="Aggregation", label="Aggregation", choices=["Mean", "Max"], selected="Mean"),
+
 				# Toggle rendering features. All are on by default.
 				ui.input_checkbox_group(id="Features", label="Heatmap Features",
 					choices={"row": "Row Dendrogram", "col": "Column Dendrogram", "x": "X Labels", "y": "Y Labels", "legend": "Legend"},
@@ -289,7 +650,7 @@ app_ui = ui.page_fluid(
 
 		# Add the main interface tabs.
 		ui.navset_tab(
-				ui.nav_panel("Interactive", ui.output_plot("Heatmap", height="90vh"), value="Interactive"),
+				ui.nav_panel("Interactive", ui.output_plot("Heatmap", height="90vh", brush=ui.brush_opts(reset_on_new=True), dblclick=True), value="Interactive"),
 				ui.nav_panel("Row Dendrogram", ui.output_plot("RowDendrogram", height="90vh"), value="Row"),
 				ui.nav_panel("Column Dendrogram", ui.output_plot("ColumnDendrogram", height="90vh"), value="Column"),
 				Table,
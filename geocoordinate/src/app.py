@@ -25,6 +25,17 @@ from shared import Table, Cache, NavBar, FileSelection
 import branca, certifi, xyzservices
 
 
+# The example files, and their display names.
+Examples = {
+	"example1.txt": "Example 1",
+	"example2.txt": "Example 2",
+	"example3.txt": "Example 3",
+	"example1.csv": "Example 4",
+	"example21.csv": "Example 5",
+	"example3.csv": "Example 6"
+}
+
+
 def server(input: Inputs, output: Outputs, session: Session):
 
 	Info = {
@@ -37,7 +48,8 @@ def server(input: Inputs, output: Outputs, session: Session):
 
 	}
 
-	DataCache = Cache("geocoordinate")
+	DataCache = Cache("geocoordinate", Cache.LeanHandler(labels=(), floats=None, integers=False))
+	DataCache.Warm(session, Examples)
 
 
 	def GenerateMap(df, map):
@@ -79,7 +91,7 @@ def server(input: Inputs, output: Outputs, session: Session):
 		df = df.sort_values(by=default_time)
 
 		# Normalize
-		values = df[default_value]
+		values = df[default_value].astype(float)
 		df[default_value] = (values - values.min()) / (values.max() - values.min())
 
 		# Group data by time
@@ -237,14 +249,7 @@ app_ui = ui.page_fluid(
 		ui.sidebar(
 
 			FileSelection(
-				examples={
-					"example1.txt": "Example 1",
-					"example2.txt": "Example 2",
-					"example3.txt": "Example 3",
-					"example1.csv": "Example 4",
-					"example21.csv": "Example 5",
-					"example3.csv": "Example 6"
-				},
+				examples=Examples,
 				types=[".csv", ".txt", ".xlsx"]
 			),
 
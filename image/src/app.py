@@ -22,6 +22,10 @@ from PIL import Image
 from shared import Table, Cache, NavBar, FileSelection
 
 
+# The example files, and their display names.
+Examples = {"example1.txt": "Example 1"}
+
+
 def server(input: Inputs, output: Outputs, session: Session):
 
 	# Information regarding example files.
@@ -33,6 +37,7 @@ def server(input: Inputs, output: Outputs, session: Session):
 	}
 
 	DataCache = Cache("image")
+	DataCache.Warm(session, Examples, [DataCache.Source + info["Image"] for info in Info.values()])
 
 	async def LoadImage():
 		"""
@@ -48,7 +53,7 @@ def server(input: Inputs, output: Outputs, session: Session):
 			n = Info[input.Example()]["Image"]
 			cache = DataCache.Cache()
 			if n not in cache:
-				cache[n] = Image.open(BytesIO(await DataCache.Download(DataCache.Source + n)))
+				cache[n] = Image.open(BytesIO(await DataCache.Fetch(DataCache.Source + n)))
 			return cache[n]
 
 
@@ -151,7 +156,7 @@ app_ui = ui.page_fluid(
 	ui.layout_sidebar(
 		ui.sidebar(
 
-			FileSelection(examples={"example1.txt": "Example 1"}, types=[".csv", ".txt", ".xlsx"]),
+			FileSelection(examples=Examples, types=[".csv", ".txt", ".xlsx"]),
 
 			ui.panel_conditional("input.SourceFile === 'Upload'", ui.input_file("Image", "Choose your Image File", accept=[".png", ".jpg"], multiple=False)),
 
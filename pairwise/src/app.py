@@ -16,13 +16,327 @@
 
 from shiny import App, Inputs, Outputs, Session, reactive, render, ui
 from matplotlib.pyplot import subplots, colorbar
-from scipy.spatial.distance import pdist, squareform
-from Bio.PDB import PDBParser
+from scipy.spatial.distance import cdist, pdist, squareform
+from scipy.spatial import cKDTree
+from scipy.stats import rankdata
 from Bio import SeqIO
-from pandas import DataFrame, read_csv, read_excel, read_table
+from pandas import DataFrame, concat, read_csv, read_excel, read_table
+from numpy import arange, argsort, asarray, bincount, char, concatenate, diag, diff, empty, errstate, fill_diagonal, flatnonzero, float32, frombuffer, full, inf, int64, isnan, lexsort, maximum, min_scalar_type, minimum, nan, outer, repeat, sqrt, take_along_axis, uint8, uint64, unique, where, zeros
+from scipy.sparse import csr_matrix
 from pathlib import Path
+from io import TextIOWrapper
+from asyncio import gather
+
+from shared import Table, Cache, NavBar, FileSelection, Store, Raster, RasterThreshold, Pyramid, Patch, GlobalMetrics, Pool, Block, Condensed, Summary, Directory, OutOfCore
+
+
+# The example files, and their display names.
+Examples = {"example1.txt": "Example 1", "example2.txt": "Example 2", "example3.txt": "Example 3"}
+
+# K-mers longer than fit in 64 bits are hashed with this multiplier instead.
+Multiplier = uint64(0x9E3779B97F4A7C15)
+
+# The distance methods SparseDistances() computes without densifying the k-mer frequencies.
+SparseMetrics = ("euclidean", "sqeuclidean", "cosine", "correlation", "cityblock", "braycurtis")
+
+# The most cells of k-mer frequencies that other distance methods, or rank correlations, may densify.
+Densest = 1 << 26
+
+# The distance methods a KD-tree can find contacts with, and their Minkowski p.
+TreeMetrics = {"euclidean": 2, "cityblock": 1, "chebyshev": inf, "minkowski": 2}
+
+
+def Kmers(sequences, k):
+	"""
+	@brief Counts the k-mers of each sequence.
+	@param sequences: The sequences, as strings.
+	@param k: The length of each k-mer.
+	@returns A CSR matrix of shape (sequences, k-mers), holding the frequency of each k-mer within each sequence.
+	@info Each sequence is encoded as integers over the alphabet of all of them, such that every k-mer is a number
+		in that base, computed for every position of the sequence at once. Where k-mers do not fit in 64 bits, they
+		are instead hashed as they are rolled, which may, rarely, count two k-mers as one.
+	"""
+	encoded = [frombuffer(sequence.encode(), dtype=uint8) for sequence in sequences]
+	alphabet = unique(concatenate(encoded)) if encoded else []
+	table = zeros(256, dtype=uint64)
+	table[alphabet] = arange(1, len(alphabet) + 1)
+	base = uint64(len(alphabet) + 1) if (len(alphabet) + 1) ** k < 2 ** 64 else Multiplier
+
+	rows, codes = [], []
+	for i, sequence in enumerate(encoded):
+		sequence, n = table[sequence], len(sequence) - k + 1
+		if n <= 0: continue
+		code = zeros(n, dtype=uint64)
+		for j in range(k): code = code * base + sequence[j:j + n]
+		rows.append(full(n, i))
+		codes.append(code)
+	if not codes: return csr_matrix((len(sequences), 0))
+
+	kmers, columns = unique(concatenate(codes), return_inverse=True)
+	rows = concatenate(rows)
+	weights = 1 / bincount(rows, minlength=len(sequences))[rows]
+	return csr_matrix((weights, (rows, columns)), shape=(len(sequences), len(kmers)))
+
+
+def SparseDistances(frequencies, metric):
+	"""
+	@brief Computes the distances between the rows of a sparse matrix.
+	@param frequencies: The sparse matrix, from Kmers()
+	@param metric: The distance metric.
+	@returns The condensed distance matrix, as returned by pdist.
+	@info Euclidean, squared Euclidean, cosine and correlation distances are derived from the dot products of the
+		rows, and city block and Bray-Curtis distances from the sums of their minima, without ever densifying them.
+		Other metrics are computed by pdist on the dense matrix.
+	"""
+	if metric not in SparseMetrics: return pdist(frequencies.toarray(), metric=metric)
+
+	# Frequencies are non-negative, so |a - b| = a + b - 2 min(a, b).
+	if metric in ("cityblock", "braycurtis"):
+		sums = asarray(frequencies.sum(axis=1)).ravel()
+		totals = sums[:, None] + sums[None, :]
+		matrix = (totals - 2 * Minima(frequencies)).clip(0)
+		if metric == "braycurtis":
+			with errstate(invalid="ignore"): matrix /= totals
+		fill_diagonal(matrix, 0)
+		return squareform(matrix, checks=False)
+
+	gram = (frequencies @ frequencies.T).toarray()
+
+	# Centering a row subtracts its mean from every k-mer, including those it lacks.
+	if metric == "correlation":
+		means = asarray(frequencies.mean(axis=1)).ravel()
+		gram -= frequencies.shape[1] * outer(means, means)
+
+	norms = diag(gram)
+	match metric:
+		case "euclidean": matrix = sqrt((norms[:, None] + norms[None, :] - 2 * gram).clip(0))
+		case "sqeuclidean": matrix = (norms[:, None] + norms[None, :] - 2 * gram).clip(0)
+		case _: matrix = 1 - gram / sqrt(outer(norms, norms))
+	fill_diagonal(matrix, 0)
+	return squareform(matrix, checks=False)
+
+
+def Minima(frequencies):
+	"""
+	@brief Sums the elementwise minima of every pair of rows of a sparse, non-negative matrix.
+	@param frequencies: The sparse matrix, from Kmers()
+	@returns A dense matrix of the sums, between each pair of rows.
+	@info Each row only visits the rows that share a column with it, found through the columns, so this costs about
+		as much as there are shared k-mers.
+	"""
+	rows, columns = frequencies.tocsr(), frequencies.tocsc()
+	minima = zeros((rows.shape[0],) * 2)
+	for i in range(rows.shape[0]):
+		start, end = rows.indptr[i], rows.indptr[i + 1]
+		shared = columns[:, rows.indices[start:end]]
+		values = minimum(shared.data, repeat(rows.data[start:end], diff(shared.indptr)))
+		minima[i] = bincount(shared.indices, weights=values, minlength=rows.shape[0])
+	return minima
+
+
+def ContactMap(coordinates, groups, cutoff, p):
+	"""
+	@brief Finds the distances between points that lie within a cutoff of each other.
+	@param coordinates: The points, one per row.
+	@param groups: The group of each point, such as its residue, counting up from 0, or None to keep every point.
+	@param cutoff: The largest distance kept.
+	@param p: The Minkowski p of the distance.
+	@returns A CSR matrix of the distances within the cutoff, between points or the closest points of each group.
+	@info A KD-tree only visits pairs of points whose regions lie within the cutoff of each other, so this costs about
+		as much as there are contacts, rather than the O(n²) of pdist.
+	"""
+	tree = cKDTree(coordinates)
+	pairs = tree.sparse_distance_matrix(tree, cutoff, p=p, output_type="ndarray")
+	if groups is None: return csr_matrix((pairs["v"], (pairs["i"], pairs["j"])), shape=(len(coordinates),) * 2)
+
+	# Sort the pairs by their groups, and keep the first, closest pair of each.
+	rows, columns, distances = groups[pairs["i"]], groups[pairs["j"]], pairs["v"]
+	order = lexsort((distances, columns, rows))
+	rows, columns, distances = rows[order], columns[order], distances[order]
+	first = concatenate([[True], (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])])
+	return csr_matrix((distances[first], (rows[first], columns[first])), shape=(groups[-1] + 1,) * 2)
+
+
+def GroupDistances(coordinates, groups, metric):
+	"""
+	@brief Computes the distance between the closest points of each pair of groups.
+	@param coordinates: The points, one per row.
+	@param groups: The group of each point, counting up from 0.
+	@param metric: The distance metric.
+	@returns A square numpy array, with a row and column for each group.
+	@info Groups are compared a block at a time, such that only about Block distances between points are held at once.
+	"""
+	starts = flatnonzero(diff(groups, prepend=-1))
+	if metric in GlobalMetrics:
+		distances = squareform(pdist(coordinates, metric=metric))
+		return minimum.reduceat(minimum.reduceat(distances, starts, axis=1), starts, axis=0)
+
+	# Every block holds whole groups, such that each can be reduced to its closest points within it.
+	n, bounds = len(starts), concatenate([starts, [len(coordinates)]])
+	blocks = sorted(set(starts.searchsorted(arange(0, len(coordinates), max(1, Block // len(coordinates)))))) + [n]
+
+	matrix = empty((n, n))
+	for first, last in zip(blocks, blocks[1:]):
+		distances = minimum.reduceat(cdist(coordinates[bounds[first]:bounds[last]], coordinates, metric=metric), starts, axis=1)
+		matrix[first:last] = minimum.reduceat(distances, starts[first:last] - bounds[first], axis=0)
+	return matrix
+
+
+def Ranked(values, method):
+	"""
+	@brief Computes the Pearson or Spearman correlation between every pair of columns.
+	@param values: A numpy array of the observations, one per row, without missing values.
+	@param method: Either "pearson" or "spearman".
+	@returns A square numpy array, as DataFrame.corr would return.
+	@info Spearman is the Pearson correlation of the ranks, with ties given their average as pandas does, so both
+		reduce to a single matrix product of the centered columns. Constant columns, which have no correlation, are NaN.
+	"""
+	values = rankdata(values, axis=0) if method == "spearman" else asarray(values, dtype=float)
+	values = values - values.mean(axis=0)
+	norms = (values * values).sum(axis=0)
+	with errstate(divide="ignore", invalid="ignore"): matrix = (values.T @ values) / sqrt(outer(norms, norms))
+	matrix[norms == 0] = matrix[:, norms == 0] = nan
+	fill_diagonal(matrix, [1 if norm else nan for norm in norms])
+	return matrix.clip(-1, 1)
+
+
+def Ties(same):
+	"""
+	@brief Counts the tied pairs in sorted rows.
+	@param same: A boolean numpy array, marking where each value of a row equals the one before it.
+	@returns The amount of tied pairs in each row.
+	@info A value tied with the k values before it forms k pairs, and k is its distance from the start of its run.
+	"""
+	index = arange(same.shape[-1] + 1)
+	starts = maximum.accumulate(where(concatenate([full(same.shape[:-1] + (1,), False), same], axis=-1), 0, index), axis=-1)
+	return (index - starts).sum(axis=-1)
+
+
+def Kendall(ranks, start, stop):
+	"""
+	@brief Computes the Kendall tau-b between a range of columns and every later column.
+	@param ranks: A numpy array of the dense ranks of each column, counting up from 0, one column per row.
+	@param start: The first column.
+	@param stop: The column after the last.
+	@returns A list of numpy arrays, holding the correlations of each column with those after it.
+	@info As in scipy's kendalltau, the observations are sorted by both columns, such that the discordant pairs
+		are the inversions of the second column, which are counted in O(n log n) by a radix sort: a pair is inverted
+		at the first bit where the earlier value has a 1 and the later a 0. Each column is compared to all later
+		columns at once, about Block values at a time, and each pass is a single stable sort of them all.
+	"""
+	m, n = ranks.shape
+	total, order = n * (n - 1) // 2, ranks.argsort(axis=1, kind="stable")
+	ordered = take_along_axis(ranks, order, axis=1)
+	ties = Ties(ordered[:, 1:] == ordered[:, :-1])
+	index, step, bits = arange(n), max(1, Block // max(n, 1)), int(ranks.max(initial=0)).bit_length()
+
+	rows = []
+	for i in range(start, stop):
+		row = []
+		for first in range(i + 1, m, step):
+			last = min(m, first + step)
+
+			# Sort each column by column i, and then by itself.
+			x = ranks[i][order[first:last]]
+			sort = x.argsort(axis=1, kind="stable")
+			x, y = take_along_axis(x, sort, axis=1), take_along_axis(ordered[first:last], sort, axis=1)
+			joint = Ties((x[:, 1:] == x[:, :-1]) & (y[:, 1:] == y[:, :-1]))
+
+			# From the highest bit down, values sharing the bits above are kept together, in order. Stably sorting
+			# by the next bit moves each 0 back past the 1s before it, and each 1 forward past the 0s after it.
+			discordant = zeros(last - first, dtype=int64)
+			for bit in reversed(range(bits)):
+				sort = (y >> bit).argsort(axis=1, kind="stable")
+				discordant += abs(sort - index).sum(axis=1) // 2
+				y = take_along_axis(y, sort, axis=1)
+
+			with errstate(divide="ignore", invalid="ignore"):
+				tau = (total - ties[i] - ties[first:last] + joint - 2 * discordant) / sqrt(total - ties[i]) / sqrt(total - ties[first:last])
+			row.append(tau.clip(-1, 1))
+		rows.append(concatenate(row + [empty(0)]))
+	return rows
+
+
+class Contacts:
+	"""
+	@brief A contact map: the distances between atoms or residues that lie within a cutoff, stored sparsely.
+	@info Pairs beyond the cutoff are not stored, and are drawn as the cutoff itself.
+	"""
+
+	def __init__(self, matrix, cutoff, labels):
+		"""
+		@brief Holds a contact map.
+		@param matrix: The distances within the cutoff, as a sparse matrix.
+		@param cutoff: The cutoff.
+		@param labels: The name of each row and column.
+		"""
+		self.Matrix, self.Cutoff, self.Labels = matrix, cutoff, labels
+		self.Shape = matrix.shape
+
 
-from shared import Table, Cache, NavBar, FileSelection
+	@property
+	def nbytes(self): return Store.Size(self.Matrix)
+
+
+	def Rows(self, start, stop):
+		"""
+		@brief Expands a range of rows.
+		@param start: The first row.
+		@param stop: The row after the last.
+		@returns A numpy array of the distances, with those beyond the cutoff set to it.
+		"""
+		rows, stored = full((stop - start, self.Shape[1]), float(self.Cutoff)), self.Matrix[start:stop].tocoo()
+		rows[stored.row, stored.col] = stored.data
+		return rows
+
+
+	def Dense(self):
+		"""
+		@brief Expands the contact map.
+		@returns A DataFrame of every distance, with those beyond the cutoff set to it.
+		"""
+		return DataFrame(self.Rows(0, self.Shape[0]), index=self.Labels, columns=self.Labels)
+
+
+class Trajectory:
+	"""
+	@brief The running mean and variance of the condensed distances of a structure's models, added one model at a time.
+	@info Welford's update only needs the mean and the sum of squared deviations so far, so however many models there
+		are, only one model's distances are held alongside them. As with Pool.Distances, accumulators larger than
+		OutOfCore are memory-mapped.
+	"""
+
+	def __init__(self, total):
+		"""
+		@brief Creates empty accumulators.
+		@param total: The amount of condensed distances of each model.
+		"""
+		mapped = Directory is not None and 2 * total * float32(0).nbytes > OutOfCore
+		self.Models = 0
+		self.Mean, self.Squares = [Pool.Allocate(total, float32) if mapped else zeros(total, dtype=float32) for _ in range(2)]
+
+
+	def Add(self, distances):
+		"""
+		@brief Adds the distances of a model.
+		@param distances: The condensed distances, as returned by pdist.
+		"""
+		self.Models += 1
+		for start in range(0, len(distances), Block):
+			values, mean = asarray(distances[start:start + Block], dtype=float), self.Mean[start:start + Block]
+			delta = values - mean
+			mean += delta / self.Models
+			self.Squares[start:start + Block] += delta * (values - mean)
+
+
+	def Variance(self):
+		"""
+		@brief Finishes the variance of the distances, as numpy.var does.
+		@returns The condensed variances.
+		@info The sums of squares are divided in place, so no further models may be added.
+		"""
+		for start in range(0, len(self.Squares), Block): self.Squares[start:start + Block] /= max(1, self.Models)
+		return self.Squares
 
 
 def server(input: Inputs, output: Outputs, session: Session):
@@ -36,12 +350,35 @@ def server(input: Inputs, output: Outputs, session: Session):
 
 	def HandleData(n, i):
 		match Path(n).suffix:
-			case ".csv": return read_csv(i)
+			case ".csv": return Cache.Read(read_csv, i)
 			case ".xlsx": return read_excel(i)
-			case ".pdb": return PDBMatrix(i)
-			case ".fasta": return FASTAMatrix(i)
-			case _: return read_table(i)
+			case ".parquet" | ".feather" | ".npy": return Cache.Binary(n, i)
+			case ".pdb": return PDBTable(i)
+			case ".fasta": return FASTATable(TextIOWrapper(i))
+			case _: return Cache.Read(read_table, i)
 	DataCache = Cache("pairwise", HandleData)
+	DataCache.Warm(session, Examples)
+
+	# Pyramids of large heatmaps, keyed by the dataset version and the parameters of the matrix.
+	Pyramids = Store()
+
+	# Condensed distance matrices of charts, keyed by the dataset version and distance method.
+	Distances = Store()
+
+	# The latest version whose distances were computed, keyed by the dataset and distance method, such that edits patch them.
+	Latest = {}
+
+	# K-mer frequencies of FASTA files, keyed by the dataset version and K.
+	Frequencies = Store()
+
+	# Matrices of PDB structures, keyed by the dataset version, chain, and the parameters of the matrix.
+	Structures = Store()
+
+	# The region of a large heatmap being viewed, as (top, bottom, left, right), or None for all of it.
+	Window = reactive.Value(None)
+
+	# Where the last large heatmap was drawn in its image, so that brushes can be mapped back onto the matrix.
+	Geometry = {}
 
 
 	async def ParseData():
@@ -50,83 +387,261 @@ def server(input: Inputs, output: Outputs, session: Session):
 		@returns	A DataFrame containing the data requested, formatted as a pairwise matrix, or
 							an empty DataFrame if we're on Upload, but the user has not supplied a file.
 		"""
+
+		# Ensembles of PDB models are streamed from the file, which is never parsed whole.
+		if Path(await DataCache.Digest(input) or "").suffix == ".pdb" and input.MatrixType() == "Distance" and input.Models() != "All":
+			return await PDBMatrix(None)
+
 		n = await DataCache.N(input)
 		df = await DataCache.Load(input)
 
 		if n is None: return DataFrame()
 		match Path(n).suffix:
-			case ".csv": df = ChartMatrix(df)
-			case ".xlsx": df = ChartMatrix(df)
-			case ".pdb": pass
-			case ".fasta": pass
-			case _: df = ChartMatrix(df)
+			case ".csv": df = await ChartMatrix(df)
+			case ".xlsx": df = await ChartMatrix(df)
+			case ".pdb": df = await PDBMatrix(df)
+			case ".fasta": df = await FASTAMatrix(df)
+			case _: df = await ChartMatrix(df)
 
-		# Fix garbage data and return the resultant DataFrame.
-		return df.fillna(0)
+		# Fix garbage data and return the resultant matrix. Contact maps have none, and condensed matrices expand
+		# theirs as 0 themselves.
+		return df if isinstance(df, (Contacts, Condensed)) else df.fillna(0)
 
 
-	def FASTAMatrix(file):
+	def FASTATable(file):
 		"""
-		@brief Computes the pairwise matrix from a FASTA file.
-		@param file: The path to the FASTA File
-		@returns a pairwise matrix.
+		@brief Reads a FASTA file.
+		@param file: The FASTA File, as a text stream.
+		@returns A DataFrame with the Name and Sequence of each record.
 		"""
+		records = list(SeqIO.parse(file, "fasta"))
+		return DataFrame({"Name": [record.id for record in records], "Sequence": [str(record.seq) for record in records]})
 
-		# Get information from the file
-		records = list(SeqIO.parse(open(file), "fasta"))
-		sequences = [str(record.seq) for record in records]
-		column_names = [record.id for record in records]
 
-		# Get our K-Mer value
-		k = input.K()
+	async def FASTAMatrix(df):
+		"""
+		@brief Computes the pairwise matrix from the k-mer frequencies of each sequence.
+		@param df: The DataFrame, from FASTATable()
+		@returns a pairwise matrix.
+		"""
+		names, k = list(df["Name"]), int(input.K())
+
+		key = (DataCache.Version(input), k)
+		if key not in Frequencies: Frequencies[key] = await Pool.Run(Kmers, [str(sequence) for sequence in df["Sequence"]], k)
+		frequencies = Frequencies[key]
 
-		# Generate the value
-		dictionary = {}
-		for x, seq in enumerate(sequences):
-			kmers = [seq[i:i+k] for i in range(len(seq) - k + 1)]
-			increment = 1 / len(kmers)
-			for kmer in kmers:
-					if kmer not in dictionary:
-							dictionary[kmer] = [0.0] * len(sequences)
-					dictionary[kmer][x] += increment
-		frequencies = DataFrame.from_dict(dictionary, orient='index')
+		# Other distance methods, and rank correlations, need the frequencies densified, which can be enormous.
+		name = input.DistanceMethod() if input.MatrixType() == "Distance" else input.CorrelationMethod()
+		method = name.lower()
+		if method not in SparseMetrics and method != "pearson" and frequencies.shape[0] * frequencies.shape[1] > Densest:
+			ui.notification_show("There are too many sequences and k-mers to use {}. Try a shorter K-Mer Length, or another method.".format(name), type="error")
+			return DataFrame()
 
 		# Calculate matrix
 		if input.MatrixType() == "Distance":
-			distances = pdist(frequencies.T, metric=input.DistanceMethod().lower())
-			return DataFrame(squareform(distances), index=column_names, columns=column_names)
+			return Condensed(await Pool.Run(SparseDistances, frequencies, method), names)
+		elif input.CorrelationMethod() == "Pearson":
+			return Condensed(1 - await Pool.Run(SparseDistances, frequencies, "correlation"), names, diagonal=1)
 		else:
-			return frequencies.corr(method=input.CorrelationMethod().lower())
+			return await Correlation(DataFrame(frequencies.toarray().T, columns=names))
 
 
-	def PDBMatrix(file):
+	def PDBModels(file):
+		"""
+		@brief Reads the atoms of a PDB file, one model at a time.
+		@param file: The PDB file, as a binary stream.
+		@returns A generator of DataFrames, one for each model, with the Model, Chain, Residue, Number, Atom, and x, y,
+			z coordinates of each atom.
+		@info The file is read a block at a time, such that only the records of one model are held at once. ATOM and
+			HETATM records are fixed-width, so every column is sliced from all of a model's records at once. As with
+			PDBParser, atoms repeated within a residue, such as alternate locations, keep only the record with the
+			highest occupancy, or the first of those tied.
 		"""
-		@brief Generates a pairwise matrix from a PDB file
-		@param file: The path to a PDB file (Or BytesIO file if applicable)
-		@returns The pairwise matrix.
+		def Atoms(records, model):
+			columns = frombuffer(b"".join(record[:60].ljust(60) for record in records), dtype=uint8).reshape(-1, 60)
+			text = lambda start, stop: columns[:, start:stop].copy().view("S{}".format(stop - start)).ravel()
+			df = DataFrame({
+				"Model": full(len(records), model),
+				"Chain": text(21, 22).astype(str),
+				"Residue": char.strip(text(17, 20).astype(str)),
+				"Number": text(22, 27).astype(str),
+				"Atom": char.strip(text(12, 16).astype(str)),
+			})
+			df[["x", "y", "z"]] = text(30, 54).reshape(-1, 1).view("S8").astype(float)
+			if not df.duplicated(subset=["Chain", "Number", "Atom"]).any(): return df
+
+			# Move the most occupied location of each atom first, keeping the file's order among ties and in the result.
+			occupancy = char.strip(text(54, 60).astype(str))
+			order = argsort(-where(occupancy == "", "0", occupancy).astype(float), kind="stable")
+			return df.iloc[order].drop_duplicates(subset=["Chain", "Number", "Atom"]).sort_index()
+
+		# Atoms before the first MODEL record belong to the first model.
+		model, records, rest = 0, [], b""
+		for block in iter(lambda: file.read(1 << 20), b""):
+			lines = (rest + block).split(b"\n")
+			rest = lines.pop()
+			for line in lines:
+				if line[:6] in (b"ATOM  ", b"HETATM"): records.append(line.rstrip(b"\r"))
+				elif line[:6] == b"MODEL ":
+					if records: yield Atoms(records, model); model += 1
+					records = []
+		if rest[:6] in (b"ATOM  ", b"HETATM"): records.append(rest.rstrip(b"\r"))
+		if records or not model: yield Atoms(records, model)
+
+
+	def PDBTable(file):
 		"""
+		@brief Reads the atoms of a PDB file.
+		@param file: The PDB file, as a binary stream.
+		@returns A DataFrame of every model, from PDBModels()
+		"""
+		return concat(PDBModels(file), ignore_index=True)
 
-		parser = PDBParser()
-		structure = parser.get_structure("protein", file)
 
-		# Extract atomic coordinates
-		coordinates = []
-		for model in structure:
-			for chain in model:
-					if chain.id == input.Chain():
-							for residue in chain:
-									for atom in residue:
-											coordinates.append(atom.coord)
+	def Selection(atoms):
+		"""
+		@brief Selects the atoms of the chain, at the chosen resolution.
+		@param atoms: The DataFrame, from PDBTable(), or a model, from PDBModels()
+		@returns The coordinates of the atoms, the residue of each, or None if atoms are not grouped, and the labels.
+		"""
+		atoms = atoms.loc[atoms["Chain"] == input.Chain()]
+		if input.Resolution() == "CA": atoms = atoms.loc[atoms["Atom"] == "CA"]
+		coordinates = atoms[["x", "y", "z"]].to_numpy(dtype=float)
 
-		# Calculate matrix
-		if input.MatrixType() == "Distance":
-			distances = pdist(coordinates, metric=input.DistanceMethod().lower())
-			return DataFrame(squareform(distances))
+		# Atoms of a residue are listed together, so each residue begins where the residue number, or model, changes.
+		starts = ((atoms["Number"] != atoms["Number"].shift()) | (atoms["Model"] != atoms["Model"].shift())).to_numpy()
+		groups = starts.cumsum() - 1 if input.Resolution() == "Residue" else None
+		labels = list((atoms["Residue"] + " " + atoms["Number"].str.strip())[starts]) if input.Resolution() != "Atom" else list(range(len(atoms)))
+		return coordinates, groups, labels
+
+
+	async def Ensemble(method):
+		"""
+		@brief Generates the mean or variance of the distances of a chain across the models of a structure.
+		@param method: The distance metric.
+		@returns The Condensed matrix of the statistic chosen by Models, or an empty DataFrame if there is no file.
+		@info Models, such as those of an NMR ensemble or an MD trajectory, are read from the file one at a time, by
+			PDBModels(), and only their running statistics are kept, in a Trajectory, such that memory does not grow
+			with the amount of models. The file is never parsed whole, so edits to the table are not seen. Models
+			whose chain differs in size from the first cannot be compared, and are skipped. Both statistics are kept,
+			as one costs the other.
+		"""
+		key = (DataCache.Version(input), input.Chain(), input.Resolution(), method)
+		if key + (input.Models(),) in Structures: return Structures[key + (input.Models(),)]
+
+		file = await DataCache.Open(input)
+		if file is None: return DataFrame()
+
+		trajectory, labels = Trajectory(0), []
+		with file:
+			for model in PDBModels(file):
+				coordinates, groups, names = Selection(model)
+				if groups is not None and len(coordinates): distances = squareform(await Pool.Run(GroupDistances, coordinates, groups, method), checks=False)
+				else: distances = await Pool.Distances(coordinates, method, float32)
+				if not trajectory.Models: trajectory, labels = Trajectory(len(distances)), names
+				if len(names) == len(labels): trajectory.Add(distances)
+
+		statistics, large = {"Mean": trajectory.Mean, "Variance": trajectory.Variance()}, len(labels) ** 2 > RasterThreshold
+		for statistic, values in statistics.items():
+			statistics[statistic] = Structures[key + (statistic,)] = Condensed(values, labels, summary=Summary.From(values, len(labels)) if large else None)
+		return statistics[input.Models()]
+
+
+	async def PDBMatrix(df):
+		"""
+		@brief Generates a pairwise matrix from the atoms of a chain.
+		@param df: The DataFrame, from PDBTable(), or None for the mean or variance across models, which are streamed.
+		@returns The pairwise matrix, or Contacts if a cutoff is set.
+		@info Residues are compared either by their alpha carbons, or by the closest of their atoms, such that the
+			matrix is as large as the chain has residues, rather than atoms. Contacts are found with a KD-tree for
+			the distance methods in TreeMetrics, and otherwise taken from the full matrix. Unless Models is "All",
+			distances are the mean or variance across the models, from Ensemble().
+		"""
+		method, cutoff = input.DistanceMethod().lower(), float(input.Cutoff() or 0)
+
+		# Ensemble() keeps its own statistics, which only need storing here once cut into contacts.
+		if input.MatrixType() == "Distance" and input.Models() != "All" and cutoff <= 0: return await Ensemble(method)
+
+		key = (DataCache.Version(input), input.Chain(), input.Resolution(), input.Cutoff(), input.MatrixType(), input.DistanceMethod(), input.CorrelationMethod(), input.Models())
+		if key not in Structures:
+
+			# Calculate matrix
+			if input.MatrixType() != "Distance": matrix = await Correlation(DataFrame(Selection(df)[0]))
+			elif input.Models() != "All": matrix = await Ensemble(method)
+			else:
+				coordinates, groups, labels = Selection(df)
+				if cutoff > 0 and method in TreeMetrics and len(coordinates):
+					matrix = Contacts(await Pool.Run(ContactMap, coordinates, groups, cutoff, TreeMetrics[method]), cutoff, labels)
+				else:
+					summary = Summary(len(coordinates)) if groups is None and cutoff <= 0 and len(coordinates) ** 2 > RasterThreshold else None
+					if groups is not None and len(coordinates): matrix = squareform(await Pool.Run(GroupDistances, coordinates, groups, method), checks=False)
+					else: matrix = await Pool.Distances(coordinates, method, float32, summary)
+					matrix = Condensed(matrix, labels, summary=summary)
+
+			# Contacts not found by the KD-tree are taken from the full matrix.
+			if cutoff > 0 and isinstance(matrix, Condensed):
+				rows, columns, distances = matrix.Within(cutoff)
+				matrix = Contacts(csr_matrix((distances, (rows, columns)), shape=matrix.Shape), cutoff, matrix.Labels)
+			Structures[key] = matrix
+		return Structures[key]
+
+
+	async def Correlation(df):
+		"""
+		@brief Computes the correlation between every pair of columns, using the selected CorrelationMethod.
+		@param df: The DataFrame.
+		@returns A DataFrame, matching DataFrame.corr.
+		@info Pandas compares every pair of columns in Python, which for Kendall takes minutes on wide tables. Instead,
+			Pearson and Spearman are a single matrix product, and Kendall's pairs of columns are divided across the
+			Pool. Tables with missing values are left to pandas, which only compares the observations two columns share.
+		"""
+		method, values = input.CorrelationMethod().lower(), df.to_numpy(dtype=float)
+		if isnan(values).any(): return df.corr(method=method)
+
+		if method != "kendall": matrix = await Pool.Run(Ranked, values, method)
 		else:
-			return DataFrame(coordinates).corr(method=input.CorrelationMethod().lower())
+			# Tau only depends on the order of each column, so the columns are replaced by their dense ranks.
+			n, ranks = values.shape[1], rankdata(values.T, method="dense", axis=1) - 1
+			ranks = ranks.astype(min_scalar_type(ranks.max(initial=0)))
+			bounds = Pool.Bounds(n, max(1, n * (n - 1) // 512))
+			rows = await gather(*[Pool.Run(Kendall, ranks, start, stop) for start, stop in zip(bounds, bounds[1:])])
+
+			# Only the upper triangle is computed, and mirrored; every column is perfectly correlated with itself.
+			matrix = squareform(concatenate([row for block in rows for row in block] + [empty(0)]), checks=False)
+			fill_diagonal(matrix, 1)
+		return DataFrame(matrix, index=df.columns, columns=df.columns)
 
 
-	def ChartMatrix(df):
+	async def Distance(coordinates, labels):
+		"""
+		@brief Returns the condensed distance matrix between points, computing it only if this dataset version and
+			distance method have not been seen before.
+		@param coordinates: The points, one per row of the chart.
+		@param labels: The name of each point, if any.
+		@returns The Condensed distance matrix.
+		@info If the distances of an earlier version are cached, and only a few rows have since been edited, only
+			their distances are recomputed, into the earlier matrix. Otherwise, matrices that will be drawn by
+			Raster are summarized as they are computed, such that they can be drawn whole without being read again.
+		"""
+		version, method = DataCache.Version(input), input.DistanceMethod()
+		key = (version, method)
+		if key not in Distances:
+			previous = Latest.get((version[0], method))
+			changes = DataCache.Changes(input, previous) if previous is not None and (previous, method) in Distances else None
+			edited = None if changes is None else sorted({row for row, _ in changes})
+
+			if edited is not None and len(edited) * 2 < len(coordinates) and method.lower() not in GlobalMetrics:
+				distances = Distances.pop((previous, method)).Values
+				Patch(distances, coordinates.astype(float), edited, method.lower())
+				Distances[key] = Condensed(distances, labels)
+			else:
+				summary = Summary(len(coordinates)) if len(coordinates) ** 2 > RasterThreshold else None
+				Distances[key] = Condensed(await Pool.Distances(coordinates, method.lower(), float32, summary), labels, summary=summary)
+			Latest[(version[0], method)] = version
+		return Distances[key]
+
+
+	async def ChartMatrix(df):
 		"""
 		@brief Generates a pairwise matrix from charts
 		@param df:	The DataFrame containing the data. This can either be a chart
@@ -163,10 +678,9 @@ def server(input: Inputs, output: Outputs, session: Session):
 
 		# Calculate a distant matrix, and return it
 		if input.MatrixType() == "Distance":
-			distances = pdist(coordinates, metric=input.DistanceMethod().lower())
-			return DataFrame(squareform(distances), index=point_names, columns=point_names)
+			return await Distance(coordinates, point_names)
 		else:
-			return DataFrame(coordinates, index=point_names, columns=point_names).corr(method=input.CorrelationMethod().lower())
+			return await Correlation(DataFrame(coordinates, index=point_names, columns=point_names))
 
 
 	async def GenerateHeatmap():
@@ -176,6 +690,39 @@ def server(input: Inputs, output: Outputs, session: Session):
 		"""
 
 		df = await ParseData()
+
+		# Contact maps and condensed matrices are only expanded if they are small enough for MatPlotLib.
+		if isinstance(df, (Contacts, Condensed)) and df.Shape[0] * df.Shape[1] <= RasterThreshold: df = df.Dense()
+
+		# Large matrices are drawn directly, as MatPlotLib would take far longer to lay them out than to compute them.
+		# The matrix is kept as a pyramid, so zooming in only ever draws the region in view.
+		# Cell annotations are not drawn, as they could not be read at this size anyway.
+		# Contact maps are drawn from their sparse matrix, where absent pairs are the cutoff, and condensed matrices
+		# expand only the rows of each block of pixels.
+		if not isinstance(df, DataFrame) or df.size > RasterThreshold:
+			key = (DataCache.Version(input), input.MatrixType(), input.DistanceMethod(), input.CorrelationMethod(), input.Chain(), input.Resolution(), input.Cutoff(), input.Models(), input.K(), input.Aggregation())
+			if key not in Pyramids:
+				if isinstance(df, Contacts): Pyramids[key] = Pyramid(df.Matrix, aggregate=input.Aggregation(), fill=df.Cutoff)
+				else: Pyramids[key] = Pyramid(df, aggregate=input.Aggregation())
+			labels = list(df.columns) if isinstance(df, DataFrame) else df.Labels
+
+			image = Raster.Heatmap(
+				Pyramids[key],
+				input.ColorMap().lower(),
+				rows=labels if "y" in input.Features() else None,
+				columns=labels if "x" in input.Features() else None,
+				legend="legend" in input.Features(),
+				text=input.TextSize(),
+				window=Window(),
+			)
+
+			# Levels built for this view are now counted against the budget.
+			Pyramids[key] = Pyramids[key]
+			Geometry["Heatmap"] = image.info["Geometry"]
+			return image
+
+		Geometry.clear()
+
 		fig, ax = subplots()
 
 		im = ax.imshow(df, cmap=input.ColorMap().lower(), interpolation=input.Interpolation().lower())
@@ -214,9 +761,24 @@ def server(input: Inputs, output: Outputs, session: Session):
 
 	@output
 	@render.plot
-	@reactive.event(input.Update, input.Reset, input.Example, input.File, input.MatrixType, input.TextSize, input.DistanceMethod, input.CorrelationMethod, input.Interpolation, input.ColorMap, input.Features, input.Chain, input.K, ignore_none=False, ignore_init=False)
+	@reactive.event(input.Update, input.Reset, input.Example, input.File, input.MatrixType, input.TextSize, input.DistanceMethod, input.CorrelationMethod, input.Interpolation, input.ColorMap, input.Features, input.Chain, input.Resolution, input.Cutoff, input.Models, input.K, input.Aggregation, Window, ignore_none=False, ignore_init=False)
 	async def Heatmap(): return await GenerateHeatmap()
 
+
+	@reactive.Effect
+	@reactive.event(input.Heatmap_brush)
+	def Zoom():
+		"""
+		@brief Zooms a large heatmap into the brushed region.
+		"""
+		if input.Heatmap_brush() is not None and "Heatmap" in Geometry:
+			Window.set(Raster.Zoom(Geometry["Heatmap"], input.Heatmap_brush()))
+
+
+	@reactive.Effect
+	@reactive.event(input.Heatmap_dblclick, input.Example, input.File, input.MatrixType, input.Chain, input.Resolution, input.Cutoff, input.Models, input.K)
+	def Unzoom(): Window.set(None)
+
 	@output
 	@render.text
 	def ExampleInfo(): return Info[input.Example()]
@@ -226,6 +788,21 @@ def server(input: Inputs, output: Outputs, session: Session):
 	async def DownloadTable(): df = await DataCache.Load(input); yield df.to_string()
 
 
+	@render.download(filename="matrix.csv")
+	async def DownloadMatrix():
+		"""
+		@brief Downloads the pairwise matrix, expanding condensed matrices and contact maps a block of rows at a time.
+		"""
+		df = await ParseData()
+		if isinstance(df, DataFrame): yield df.to_csv(); return
+
+		yield "," + ",".join(map(str, df.Labels)) + "\n"
+		step = max(1, Block // max(1, df.Shape[1]))
+		for start in range(0, df.Shape[0], step):
+			stop = min(df.Shape[0], start + step)
+			yield DataFrame(df.Rows(start, stop), index=df.Labels[start:stop]).to_csv(header=False)
+
+
 	@reactive.Effect
 	@reactive.event(input.Update)
 	async def Update(): await DataCache.Update(input)
@@ -259,8 +836,8 @@ app_ui = ui.page_fluid(
 		ui.sidebar(
 
 			FileSelection(
-				examples={"example1.txt": "Example 1", "example2.txt": "Example 2", "example3.txt": "Example 3"},
-				types=[".csv", ".txt", ".xlsx", ".pdb", ".dat", ".fasta"]
+				examples=Examples,
+				types=[".csv", ".txt", ".xlsx", ".pdb", ".dat", ".fasta", ".parquet", ".feather", ".npy"]
 			),
 
 			# Specify Matrix Type
@@ -288,6 +865,10 @@ app_ui = ui.page_fluid(
 			# Set the ColorMap used.
 			ui.input_select(id="ColorMap", label="Color Map", choices=["Viridis", "Plasma", "Inferno", "Magma", "Cividis"], selected="Viridis"),
 
+			# Large heatmaps show more rows than pixels, so each pixel shows either the mean or the max of its block.
+			# Drag over them to zoom in, and double click to zoom back out.
+			ui.input_select(id="Aggregation", label="Aggregation", choices=["Mean", "Max"], selected="Mean"),
+
 			# Customize what aspects of the heatmap are visible
 			ui.input_checkbox_group(id="Features", label="Heatmap Features",
 					choices={"x": "X Labels", "y": "Y Labels", "label": "Data Labels", "legend": "Legend"},
@@ -296,16 +877,26 @@ app_ui = ui.page_fluid(
 			# Specify the PDB Chain
 			ui.input_text("Chain", "PDB Chain", "A"),
 
+			# Compare every atom, only alpha carbons, or whole residues by their closest atoms.
+			ui.input_select(id="Resolution", label="PDB Resolution", choices={"Atom": "Atoms", "CA": "Alpha Carbons", "Residue": "Residues"}, selected="Atom"),
+
+			# Only keep distances within this many Ångströms, such that large structures are stored sparsely, as a contact map. 0 keeps every distance.
+			ui.input_numeric(id="Cutoff", label="PDB Contact Cutoff", value=0, min=0, step=0.5),
+
+			# Multi-model structures, such as NMR ensembles and trajectories, can be drawn as a whole, or by the mean or variance of each distance across the models.
+			ui.input_select(id="Models", label="PDB Models", choices={"All": "All Models", "Mean": "Mean Distance", "Variance": "Distance Variance"}, selected="All"),
+
 			# Customize the K-mer to compute for FASTA sequences
-			ui.input_numeric(id="K", label="K-Mer Length", value=3, min=3, max=5, step=1),
+			ui.input_numeric(id="K", label="K-Mer Length", value=3, min=1, max=64, step=1),
 
 			# Add the download buttons.
 			ui.download_button("DownloadTable", "Download Table"),
+			ui.download_button("DownloadMatrix", "Download Matrix"),
 		),
 
 		# Add the main interface tabs.
 		ui.navset_tab(
-				ui.nav_panel("Interactive", ui.output_plot("Heatmap", height="90vh")),
+				ui.nav_panel("Interactive", ui.output_plot("Heatmap", height="90vh", brush=ui.brush_opts(reset_on_new=True), dblclick=True)),
 				Table
 		),
 	)
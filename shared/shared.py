@@ -8,24 +8,227 @@
 
 from shiny import App, Inputs, Outputs, Session, reactive, render, ui
 from shiny.types import FileInfo
-from pandas import DataFrame, read_csv, read_excel, read_table
-from io import BytesIO
+from shiny.session import get_current_session
+from pandas import DataFrame, Series, read_csv, read_excel, read_table, read_parquet, read_feather, to_numeric, concat
+from pandas.api.types import union_categoricals
+from io import BytesIO, FileIO
+from os.path import getsize
 from sys import modules
-from copy import deepcopy
 from pathlib import Path
+from collections import OrderedDict
+from sys import getsizeof
+from hashlib import sha256
+from asyncio import ensure_future, to_thread, wait, gather, get_running_loop, Semaphore
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from pickle import dump, load
+from tempfile import TemporaryFile
+from numpy import save as npsave, load as npload, arange, asarray, asanyarray, empty, full, isnan, linspace, nanmax, nanmin, uint8, zeros, add, maximum, minimum, concatenate, diff, flatnonzero, lexsort, where, float32, outer, memmap, nan_to_num, var, cov, inf, int64, dtype as DataType
+from math import ceil, floor, log2, sqrt
+from sys import platform
 
 # If pyodide is found, we're running WebAssembly.
 if "pyodide" in modules:
 	from pyodide.http import pyfetch
+	import js
 	Pyodide = True
 # Otherwise,
 else:
 	from os.path import exists
+	from os import environ, replace, rename, getpid, cpu_count
+	from shutil import rmtree
 	Pyodide = False
 
+	# The peak memory of the process is reported by the OS, where it can be.
+	try: from resource import getrusage, RUSAGE_SELF
+	except ImportError: getrusage = None
+
+	# Parsed uploads are persisted to disk when a Parquet engine is available.
+	try: from pyarrow.feather import read_table as read_arrow; Persistent = True
+	except ImportError: Persistent = False
+
 
 TemporalColumns = {"time", "date"}
 
+# The default amount of memory, in bytes, that each store within a Cache may hold.
+Budget = 512 * 1024 * 1024
+
+# Where parsed uploads are persisted, if we can.
+Directory = None if Pyodide else Path(environ.get("HEATMAPPER_CACHE", Path.home() / ".cache" / "heatmapper"))
+
+# The amount of bytes of parsed frames each project may persist to Directory, or MappedDirectory, before the least recently used are removed.
+Disk = 4 * Budget
+
+# The name of the browser's Cache Storage for downloaded resources. Changing it discards what browsers have stored.
+BrowserCache = "heatmapper-v1"
+
+# Text files are parsed this many rows at a time.
+Chunk = 100000
+
+# Distance matrices are computed in blocks of at most this many distances, split between the Pool's workers.
+Block = 1 << 22
+
+# Heatmaps with more cells than this are drawn directly by Raster, rather than by MatPlotLib.
+RasterThreshold = 250000
+
+# Distance matrices larger than this many bytes are computed into a memory-mapped file on disk, rather than memory.
+OutOfCore = Budget
+
+# If set, parsed frames are instead stored as memory-mapped NumPy files in this directory, such that every worker
+# maps the same physical pages. This should be a tmpfs, such as /dev/shm/heatmapper.
+MappedDirectory = None if Pyodide or "HEATMAPPER_MAPPED" not in environ else Path(environ["HEATMAPPER_MAPPED"])
+
+
+# Distance metrics scaled by the variance of the whole dataset, such that editing one observation changes every distance.
+GlobalMetrics = {"seuclidean", "mahalanobis"}
+
+
+def Patch(distances, data, indices, metric):
+	"""
+	@brief Recomputes the distances of some observations within a condensed distance matrix, in place.
+	@param distances: The condensed distance matrix, as returned by pdist.
+	@param data: The observations, one per row, including the changed ones.
+	@param indices: The observations that have changed.
+	@param metric: The distance metric, which must not be in GlobalMetrics.
+	@info This costs O(kn) distances for k changed observations, rather than the O(n²) of pdist.
+	"""
+	from scipy.spatial.distance import cdist
+
+	n = len(data)
+	for i in indices:
+		others = arange(n) != i
+		j = arange(n)[others]
+		a, b = minimum(i, j), maximum(i, j)
+		distances[n * a - a * (a + 1) // 2 + b - a - 1] = cdist(data[i:i + 1], data, metric=metric)[0, others]
+
+
+class Pool:
+	"""
+	@brief Runs expensive, independent computations on a pool of workers.
+	@info Natively, work is dispatched to a thread pool, or a process pool if HEATMAPPER_POOL is "process", of
+		HEATMAPPER_WORKERS workers, defaulting to the amount of processors. SciPy's distance routines release
+		the GIL, so threads run in parallel without copying the data; a process pool suits routines that do not.
+		HEATMAPPER_POOL of "none", and Pyodide, which has no threads, run work directly, one after the other.
+	"""
+
+	_executor = None
+	Workers = 1
+
+
+	@staticmethod
+	def Executor():
+		"""
+		@brief Returns the pool, creating it on first use.
+		@returns The executor, or None if work should be run directly.
+		"""
+		if Pyodide or environ.get("HEATMAPPER_POOL", "thread") == "none": return None
+		if Pool._executor is None:
+			Pool.Workers = int(environ.get("HEATMAPPER_WORKERS", 0)) or cpu_count()
+			Pool._executor = (ProcessPoolExecutor if environ.get("HEATMAPPER_POOL") == "process" else ThreadPoolExecutor)(Pool.Workers)
+		return Pool._executor
+
+
+	@staticmethod
+	async def Run(function, *args, **kwargs):
+		"""
+		@brief Runs a function on the pool.
+		@param function: The function. For a process pool, it and its arguments must be picklable.
+		@returns The function's result.
+		"""
+		executor = Pool.Executor()
+		if executor is None: return function(*args, **kwargs)
+		return await get_running_loop().run_in_executor(executor, partial(function, *args, **kwargs))
+
+
+	@staticmethod
+	def Rows(data, start, stop, metric, **kwargs):
+		"""
+		@brief Computes the distances from a range of observations to every later observation.
+		@param data: The observations, one per row.
+		@param start: The first observation.
+		@param stop: The observation after the last.
+		@param metric: The distance metric. Any further arguments are passed to cdist.
+		@returns The distances, in the order pdist would place them.
+		"""
+		from scipy.spatial.distance import cdist
+		distances = cdist(data[start:stop], data[start + 1:], metric=metric, **kwargs)
+		return distances[arange(stop - start)[:, None] <= arange(len(data) - start - 1)[None, :]]
+
+
+	@staticmethod
+	def Bounds(n, blocks):
+		"""
+		@brief Divides the rows of a triangle, where each row is paired with every later one, into blocks.
+		@param n: The amount of rows.
+		@param blocks: The amount of blocks.
+		@returns The first row of each block, followed by n.
+		@info Each row has one fewer pair than the last, so the rows are divided such that every block holds about
+			as many pairs, rather than as many rows.
+		"""
+		before = arange(n + 1) * (n - 1) - arange(n + 1) * arange(-1, n) // 2
+		return sorted(set(before.searchsorted(linspace(0, before[-1], blocks + 1)).clip(0, n)))
+
+
+	@staticmethod
+	def Allocate(length, dtype):
+		"""
+		@brief Allocates an array in a memory-mapped file on disk.
+		@param length: The amount of elements.
+		@param dtype: The type of each element.
+		@returns The array.
+		@info The file is unlinked as soon as it is mapped, so it is removed once the array is freed, even if the
+			worker is killed.
+		"""
+		directory = Directory / "distances"
+		directory.mkdir(parents=True, exist_ok=True)
+		with TemporaryFile(dir=directory) as file: return memmap(file, dtype=dtype, mode="w+", shape=(length,))
+
+
+	@staticmethod
+	async def Distances(data, metric, dtype = float, summary = None):
+		"""
+		@brief Computes a condensed distance matrix, splitting it between the workers.
+		@param data: The observations, one per row.
+		@param metric: The distance metric.
+		@param dtype: The type the distances are stored as, such as float32 to halve their footprint.
+		@param summary: A Summary to bin the distances into as they are computed, if any.
+		@returns The condensed distance matrix, as returned by pdist.
+		@info Each observation is only compared to those after it, so the rows are divided by Bounds(). Natively,
+			matrices larger than OutOfCore are written into a memory-mapped file, such that only the blocks being
+			computed are ever held in memory, however many observations there are.
+		"""
+		from scipy.spatial.distance import pdist
+
+		n = len(data)
+		total = n * (n - 1) // 2
+		executor = Pool.Executor()
+		mapped = Directory is not None and total * DataType(dtype).itemsize > OutOfCore
+		if not mapped and summary is None and (executor is None or metric in GlobalMetrics or total < Block):
+			return (await Pool.Run(pdist, data, metric=metric)).astype(dtype, copy=False)
+
+		# Metrics scaled by the whole dataset are given its scale up front, such that every block agrees.
+		kwargs = {}
+		if metric == "seuclidean": kwargs["V"] = var(data, axis=0, ddof=1)
+		if metric == "mahalanobis":
+			from numpy.linalg import inv
+			kwargs["VI"] = inv(cov(asarray(data, dtype=float).T)).T
+
+		# The amount of distances before each observation's, such that each block knows where to go.
+		before = arange(n + 1) * (n - 1) - arange(n + 1) * arange(-1, n) // 2
+		bounds = Pool.Bounds(n, max(Pool.Workers * 4, ceil(total / Block)))
+
+		# Each block is copied in as soon as it is done, and only two per worker are in flight at once, such that
+		# finished blocks never queue behind those yet to be computed.
+		distances = Pool.Allocate(total, dtype) if mapped else empty(total, dtype=dtype)
+		slots = Semaphore(2 * Pool.Workers)
+		async def Fill(start, stop):
+			async with slots:
+				block = await Pool.Run(Pool.Rows, data, start, stop, metric, **kwargs)
+				distances[before[start]:before[start] + len(block)] = block
+				if summary is not None: summary.Merge(await Pool.Run(Summary.Partial, block, start, stop, n, summary.Edges))
+		await gather(*(Fill(start, stop) for start, stop in zip(bounds, bounds[1:])))
+		return distances
+
 
 def Filter(columns, good_columns, bad_columns):
 	ret = None
@@ -40,6 +243,195 @@ def Filter(columns, good_columns, bad_columns):
 	return ret
 
 
+class Store:
+	"""
+	@brief A size-aware, least-recently-used dictionary that holds the Cache's objects.
+	@info Each entry is measured when it is inserted. Once the total exceeds the budget, the least
+		recently used entries are evicted until it fits, save for the newest, which is always kept.
+	"""
+
+	def __init__(self, budget = Budget):
+		"""
+		@brief Initialize an empty store.
+		@param budget: The amount of bytes the store may hold before evicting. None disables eviction.
+		"""
+
+		self._entries = OrderedDict()
+		self._sizes = {}
+		self.Budget = budget
+		self.Bytes = 0
+
+		# Counters, for diagnosing how effective the store is.
+		self.Hits = 0
+		self.Misses = 0
+		self.Evictions = 0
+
+
+	@staticmethod
+	def Size(value):
+		"""
+		@brief Returns the footprint of an object, in bytes.
+		@param value: The object. DataFrames are measured deeply, arrays by their buffer, sparse matrices by their
+			buffers, images by their pixels. Memory-mapped arrays are paged by the OS, so only their header counts.
+		@returns The size of the object.
+		"""
+		if isinstance(value, DataFrame): return int(value.memory_usage(index=True, deep=True).sum())
+		if isinstance(value, memmap): return getsizeof(value)
+		if hasattr(value, "nbytes"): return int(value.nbytes)
+		if hasattr(value, "nnz"): return int(value.data.nbytes + value.indices.nbytes + value.indptr.nbytes)
+		if hasattr(value, "getbands"): return value.width * value.height * len(value.getbands())
+		return getsizeof(value)
+
+
+	def __contains__(self, key):
+		if key in self._entries: self.Hits += 1; return True
+		self.Misses += 1
+		return False
+
+
+	def __getitem__(self, key):
+		self._entries.move_to_end(key)
+		return self._entries[key]
+
+
+	def __setitem__(self, key, value):
+		if key in self._entries: self.Bytes -= self._sizes[key]
+		self._entries[key] = value
+		self._entries.move_to_end(key)
+		self._sizes[key] = Store.Size(value)
+		self.Bytes += self._sizes[key]
+		self.Evict()
+
+
+	def __delitem__(self, key):
+		del self._entries[key]
+		self.Bytes -= self._sizes.pop(key)
+
+
+	def __len__(self): return len(self._entries)
+
+
+	def pop(self, key, default=None):
+		if key not in self._entries: return default
+		value = self._entries[key]
+		del self[key]
+		return value
+
+
+	def Evict(self):
+		"""
+		@brief Evicts the least recently used entries until the store fits within its budget.
+		"""
+		if self.Budget is None: return
+		while self.Bytes > self.Budget and len(self._entries) > 1:
+			key = next(iter(self._entries))
+			del self[key]
+			self.Evictions += 1
+
+
+	def Stats(self):
+		"""
+		@brief Returns the store's counters.
+		@returns A dictionary of the entries, bytes, budget, hits, misses and evictions.
+		"""
+		return {"Entries": len(self), "Bytes": self.Bytes, "Budget": self.Budget, "Hits": self.Hits, "Misses": self.Misses, "Evictions": self.Evictions}
+
+
+class TooLarge(Exception):
+	"""
+	@brief Raised when an upload exceeds the limits of the Cache.
+	"""
+
+
+class Upload(FileIO):
+	"""
+	@brief An uploaded file, which tracks how far into it the parser has read so that progress can be reported.
+	"""
+
+	def __init__(self, path, rows = None):
+		"""
+		@brief Open an upload.
+		@param path: The path to the file.
+		@param rows: The amount of rows handlers may read from it, or None for no limit.
+		"""
+		super().__init__(path, "rb")
+		self.Size = max(getsize(path), 1)
+		self.Position = 0
+		self.Rows = rows
+
+
+	def read(self, size = -1):
+		data = super().read(size)
+		self.Position += len(data)
+		return data
+
+
+	def readinto(self, buffer):
+		count = super().readinto(buffer)
+		self.Position += count or 0
+		return count
+
+
+	def seek(self, offset, whence = 0):
+		self.Position = super().seek(offset, whence)
+		return self.Position
+
+
+class Mapped:
+	"""
+	@brief Stores DataFrames as a directory of memory-mapped NumPy files, which can be shared between processes.
+	@info Each numeric column is saved as its own .npy file, and mapped read-only on load, such that the
+		DataFrame holds no private copy of it. The index, column names, and any non-numeric columns are
+		pickled alongside.
+	"""
+
+	@staticmethod
+	def Save(path, df):
+		"""
+		@brief Saves a DataFrame.
+		@param path: The directory to save into. It is written atomically, so concurrent workers can race.
+		@param df: The DataFrame
+		"""
+		temporary = path.with_name("{}.{}.tmp".format(path.name, getpid()))
+		temporary.mkdir(parents=True, exist_ok=True)
+
+		numeric = [i for i in range(df.shape[1]) if df.dtypes.iloc[i].kind in "biuf"]
+		for i in numeric: npsave(temporary / "{}.npy".format(i), df.iloc[:, i].to_numpy())
+		other = df.iloc[:, [i for i in range(df.shape[1]) if i not in numeric]]
+		with open(temporary / "frame.pickle", "wb") as file:
+			dump({"columns": df.columns, "index": df.index, "numeric": numeric, "other": other}, file)
+
+		# If another worker beat us to it, use theirs.
+		try: rename(temporary, path)
+		except OSError: rmtree(temporary, ignore_errors=True)
+
+
+	@staticmethod
+	def Load(path):
+		"""
+		@brief Loads a DataFrame saved by Save()
+		@param path: The directory.
+		@returns The DataFrame, whose numeric columns are read-only memory maps.
+		"""
+		with open(path / "frame.pickle", "rb") as file: meta = load(file)
+		other = iter(range(meta["other"].shape[1]))
+		data = {i: npload(path / "{}.npy".format(i), mmap_mode="r") if i in meta["numeric"] else meta["other"].iloc[:, next(other)].array for i in range(len(meta["columns"]))}
+		df = DataFrame(data, index=meta["index"], copy=False)
+		df.columns = meta["columns"]
+		return df
+
+
+# Examples and static resources are identical for every session, so they are held once per worker in this
+# process-wide tier. Sessions never modify them, and layer their own edits on top.
+Shared = Store(Budget)
+
+# Examples that are currently being fetched, so that concurrent sessions wait on a single download.
+Pending = {}
+
+# Uploads that are currently being parsed. The peak is only restarted when no other parse would lose its own.
+Measuring = set()
+
+
 class Cache:
 	"""
 	@brief A class that encompasses fetching/storing web resources.
@@ -48,43 +440,229 @@ class Cache:
 	@staticmethod
 	def DefaultHandler(n, i):
 		"""
-		@brief The default handler. It can handle csv, xlsx, and defaults all other files to read_table
+		@brief The default handler. It can handle csv, xlsx, the formats of Binary(), and defaults all other files to read_table
 		@param n: The name of the file. We use this for pattern matching against the suffix.
 		@param i: The binary of the file (Either via read() or BytesIO())
 		@returns: A null-filled DataFrame.
 		"""
 		match Path(n).suffix:
-			case ".csv": df = read_csv(i)
+			case ".csv": df = Cache.Read(read_csv, i)
 			case ".xlsx": df = read_excel(i)
-			case _: df = read_table(i)
-		return df.fillna(0)
+			case ".parquet" | ".feather" | ".npy": df = Cache.Binary(n, i)
+			case _: df = Cache.Read(read_table, i)
+
+		# Only fill if we need to, as it copies the frame.
+		return df.fillna(0) if df.isna().values.any() else df
 
 
 	@staticmethod
-	async def Remote(url): r = await pyfetch(url); return await r.bytes() if r.ok else None
+	def Binary(n, i):
+		"""
+		@brief Reads binary formats: Parquet, Feather, and NumPy arrays.
+		@param n: The name of the file.
+		@param i: The binary of the file. Natively, uploads are memory-mapped rather than read.
+		@returns A DataFrame. For NumPy arrays, it is a zero-copy view of the array, and is read-only if mapped.
+		"""
+		mapped = isinstance(i, FileIO) and not Pyodide
+		match Path(n).suffix:
+			case ".parquet": return read_parquet(i.name, memory_map=True) if mapped else read_parquet(i)
+			case ".feather": return read_arrow(i.name, memory_map=True).to_pandas() if mapped else read_feather(i)
+			case ".npy":
+				array = npload(i.name, mmap_mode="r") if mapped else npload(i)
+				return DataFrame(array if array.ndim == 2 else array.reshape(-1, 1), copy=False)
+
+
+	@staticmethod
+	def Read(reader, i, **kwargs):
+		"""
+		@brief Reads a text table Chunk rows at a time, building the DataFrame incrementally.
+		@param reader: Either read_csv or read_table.
+		@param i: The binary of the file. If it is an Upload, its row limit is enforced.
+		@param kwargs: Additional arguments to the reader.
+		@returns The DataFrame.
+		@throws TooLarge if the file has more rows than permitted.
+		@info Chunks are split into their columns as they are read, and each column is joined, and its pieces
+			freed, before the next, such that the peak is the DataFrame and one column, rather than twice the DataFrame.
+		"""
+		limit, rows, first, pieces = getattr(i, "Rows", None), 0, None, None
+		with reader(i, chunksize=Chunk, **kwargs) as iterator:
+			for chunk in iterator:
+				rows += len(chunk)
+				if limit is not None and rows > limit: raise TooLarge("The file has more than {} rows.".format(limit))
+
+				# Copying the columns out lets the chunk, and its 2D blocks, be freed.
+				if first is None: first, pieces = chunk.iloc[:0], [[] for _ in range(chunk.shape[1])]
+				for j in range(chunk.shape[1]): pieces[j].append(chunk.iloc[:, j].copy())
+		if first is None:
+			if hasattr(i, "seek"): i.seek(0)
+			return reader(i, nrows=0, **kwargs)
+
+		# Each chunk has its own categories, which need to be merged.
+		data = {}
+		for j in range(len(pieces)):
+			column, pieces[j] = pieces[j], None
+			data[j] = Series(union_categoricals(column), copy=False) if first.dtypes.iloc[j] == "category" else concat(column, ignore_index=True)
+			del column
+		df = DataFrame(data, copy=False)
+		df.columns = first.columns
+		return df
+
+
+	@staticmethod
+	def LeanHandler(columns = None, labels = ("NAME", "ORF", "UNIQID"), floats = "float32", integers = True, sample = 1000):
+		"""
+		@brief Returns a handler like DefaultHandler, but which reads files into compact dtypes.
+		@param columns: The columns the application needs. The rest are never loaded. None loads every column.
+		@param labels: Columns that contain labels, which are read as categoricals.
+		@param floats: The dtype floating point columns are read as, or None to keep float64.
+		@param integers: Whether integer columns are shrunk to the smallest type that holds them. Applications
+			that do arithmetic on the raw values should keep int64, as the smaller types wrap around.
+		@param sample: The amount of rows read to infer the dtypes of each column.
+		@returns A handler that can be passed to Cache()
+		"""
+
+		usecols = None if columns is None else lambda column: column in columns
+
+		def Handler(n, i):
+			match Path(n).suffix:
+				case ".csv": reader = read_csv
+				case ".xlsx": reader = read_excel
+
+				# Binary formats already carry their dtypes.
+				case ".parquet" | ".feather" | ".npy":
+					df = Cache.Binary(n, i)
+					return df if columns is None else df[[column for column in df.columns if column in columns]]
+				case _: reader = read_table
+
+			# Sample the head of the file to decide on the dtypes.
+			head = reader(i, nrows=sample, usecols=usecols)
+			if hasattr(i, "seek"): i.seek(0)
+			dtypes = {column: "category" for column in head.columns if column in labels}
+			if floats is not None: dtypes |= {column: floats for column, dtype in head.dtypes.items() if dtype.kind == "f" and column not in labels}
+
+			# If the sample was misleading, let pandas decide.
+			read = reader if reader is read_excel else lambda i, **kwargs: Cache.Read(reader, i, **kwargs)
+			try: df = read(i, usecols=usecols, dtype=dtypes)
+			except (ValueError, TypeError):
+				if hasattr(i, "seek"): i.seek(0)
+				df = read(i, usecols=usecols, dtype={column: dtype for column, dtype in dtypes.items() if dtype == "category"})
+
+			# Shrink integers to the smallest type that holds them, and catch floats the sample missed.
+			for column, dtype in df.dtypes.items():
+				if dtype.kind in "iu" and integers: df[column] = to_numeric(df[column], downcast="integer")
+				elif dtype.kind == "f" and floats is not None and dtype != floats: df[column] = df[column].astype(floats)
+
+			# Fill nulls without a second copy of the frame.
+			for column in df.columns[(df.dtypes == "category") & df.isna().any()]:
+				df[column] = df[column].cat.add_categories([0])
+			df.fillna(0, inplace=True)
+			return df
+		return Handler
+
+
+	@staticmethod
+	async def Remote(url):
+		"""
+		@brief Fetches a resource from the web, keeping a copy in the browser's persistent Cache Storage.
+		@param url: The URL of the resource.
+		@returns The binary of the resource, or None if it could not be fetched.
+		@info A stored copy is revalidated with its ETag, so unchanged files are not downloaded again. If the
+			browser does not expose the ETag, or provides no Cache Storage, we simply download the file.
+		"""
+
+		# Cache Storage is unavailable in insecure contexts, and workers may not expose it at all.
+		caches = getattr(js, "caches", None)
+		try: store = await caches.open(BrowserCache) if caches is not None else None
+		except Exception: store = None
+
+		cached = await store.match(url) if store is not None else None
+		etag = cached.headers.get("ETag") if cached is not None else None
+
+		# If the server can't give us a new copy, fall back on what we have.
+		async def Stored(): return (await cached.arrayBuffer()).to_bytes() if cached is not None else None
+
+		try:
+			r = await pyfetch(url, headers={"If-None-Match": etag}) if etag else await pyfetch(url)
+			if r.status == 304: return await Stored()
+			if not r.ok: return await Stored()
+		except Exception:
+
+			# Conditional requests can be refused cross-origin, or we may be offline.
+			try: r = await pyfetch(url)
+			except Exception: return await Stored()
+			if not r.ok: return await Stored()
+
+		if store is not None: await store.put(url, r.js_response.clone())
+		return await r.bytes()
 
 
 	@staticmethod
 	async def Local(url): return open(url, "rb").read() if exists(url) else None
 
 
-	def __init__(self, project, DataHandler = DefaultHandler):
+	@staticmethod
+	def Hash(path):
+		"""
+		@brief Hashes the contents of a file.
+		@param path: The path to the file.
+		@returns The hexadecimal SHA-256 digest of the file.
+		"""
+		digest = sha256()
+		with open(path, "rb") as file:
+			for block in iter(lambda: file.read(1 << 20), b""): digest.update(block)
+		return digest.hexdigest()
+
+
+	def __init__(self, project, DataHandler = DefaultHandler, budget = Budget, persist = True, share = True, rows = None, size = None):
 		"""
 		@brief Initialize an instance of the Cache object.
 		@param project: The name of the project. This is used to fetch web resources.
 		@param DataHandler:	The function that should be called to process files. It should
 												take a name, and a binary stream, and return a DataFrame.
+		@param budget: The amount of bytes each store may hold before evicting the least recently used entry.
+		@param persist: Whether parsed uploads should be stored on disk. Only enable this if the output of
+			DataHandler depends solely on the file.
+		@param share: Whether parsed examples should be shared between sessions. The same caveat applies.
+		@param rows: The maximum amount of rows in an upload, or None for no limit.
+		@param size: The maximum size of an upload, in bytes, or None for no limit.
 		"""
 
+		self._project = project
+		self._share = share
+
 		# The primary cache is immutable, and is used when the resource has not been fetched before.
-		self._primary = {}
+		self._primary = Store(budget)
+
+		# User edits are not applied to the primary cache, but kept as a sparse overlay of
+		# {column: {row: value}} for each identifier. Purge deletes from here.
+		self._overlay = {}
+
+		# A counter for each identifier, incremented on every edit or reset, such that derived results can be cached.
+		self._versions = {}
 
-		# The secondary cache is mutable, and is populated by the primary cache. Purge deletes from here.
-		self._secondary = {}
+		# The cells changed by each increment of the version, as a list of [(row, column)] for each identifier,
+		# such that derived results can be patched rather than recomputed.
+		self._history = {}
 
 		# The data handler for processing the binary files.
 		self._handler = DataHandler
 
+		# The peak memory, in bytes, allocated while parsing each upload.
+		self.Peaks = {}
+
+		# Uploads exceeding these limits are rejected, and remembered so we only tell the user once.
+		self._rows, self._size = rows, size
+		self._rejected = set()
+
+		# Uploads are identified by the hash of their contents, which we compute once per upload.
+		self._digests = {}
+
+		# The directory parsed uploads are persisted to, if any.
+		self._directory = Directory / project if persist and not Pyodide and Persistent else None
+
+		# The directory parsed frames are memory-mapped from, if any.
+		self._mapped = MappedDirectory / project if persist and MappedDirectory is not None else None
+
 		# If we're in a Pyodide environment, we fetch resources from the web.
 		if Pyodide:
 			self.Download = lambda url: Cache.Remote(url)
@@ -96,15 +674,41 @@ class Cache:
 			self.Source = "../example_input/"
 
 
+	@staticmethod
+	def Materialize(df, edits):
+		"""
+		@brief Applies an overlay of edits to a DataFrame, without modifying it.
+		@param df: The immutable DataFrame from the primary cache.
+		@param edits: The overlay, a dictionary of {column: {row: value}}
+		@returns A DataFrame that shares every unedited column with df.
+		"""
+		df = df.copy(deep=False)
+		for column, rows in edits.items():
+			values = df.iloc[:, column].copy()
+			for row, value in rows.items():
+				try: values.iloc[row] = value
+				except (TypeError, ValueError): values = values.astype(object); values.iloc[row] = value
+			df.isetitem(column, values)
+		return df
+
+
 	async def Load(self, input, copy=False):
+		"""
+		@brief Returns the DataFrame of whatever the user has currently uploaded/selected, with their edits.
+		@param input: The Shiny input. See N() for required objects.
+		@param copy: Return a shallow copy, to which columns can be added or replaced without affecting the cache.
+		@returns The DataFrame. It must not be modified in place.
+		"""
 		n = await self.N(input);
-		df = DataFrame() if n is None else self._secondary[n]
-		return deepcopy(df) if copy else df
+		if n is None: return DataFrame()
+		df = self.Get(n)
+		if n in self._overlay: return Cache.Materialize(df, self._overlay[n])
+		return df.copy(deep=False) if copy else df
 
 
 	async def N(self, input):
 		"""
-		@brief Caches whatever the user has currently uploaded/selection, returning the identifier within the secondary cache.
+		@brief Caches whatever the user has currently uploaded/selection, returning the identifier within the primary cache.
 		@param input: The Shiny input variable. Importantly, these must be defined:
 			input.File: The uploaded file
 			input.Example: The selected example file
@@ -112,28 +716,348 @@ class Cache:
 		@returns: The identifier. You should probably use Load() unless you need this.
 		"""
 
+		# Reject uploads that are too large before we even hash them.
+		if input.SourceFile() == "Upload" and input.File() is not None:
+			path = input.File()[0]["datapath"]
+			if path in self._rejected: return None
+			if self._size is not None and getsize(path) > self._size:
+				self.Reject(path, "The file is larger than {} bytes.".format(self._size))
+				return None
+
 		# Grab an uploaded file, if its done, or grab an example (Using a cache to prevent redownload)
+		n = await self.Digest(input)
+		if n is None: return None
+
+		# Populate the base cache, if we need to
+		if input.SourceFile() == "Upload":
+			if n not in self._primary:
+				df = self.Restore(n)
+				if df is None:
+					try: df = self.Persist(n, await self.Parse(n, path, input.File()[0]["name"]))
+					except TooLarge as error: self.Reject(path, str(error) + self.Peak(n)); return None
+				self._primary[n] = df
+
+		else: await self.Prime(n)
+		return n
+
+
+	async def Open(self, input):
+		"""
+		@brief Opens whatever the user has currently uploaded/selected, without parsing or caching it.
+		@param input: The Shiny input. See N() for required objects.
+		@returns A binary stream of the file, or None if the user has yet to upload a file, or it was rejected.
+		@info This is for results that can be streamed from the file a piece at a time, such that it need never be
+			parsed whole. Edits apply to the parsed DataFrame, and so are not seen. Natively, examples are opened
+			from disk; Pyodide must download them whole.
+		"""
+		if input.SourceFile() == "Upload":
+			if input.File() is None: return None
+			path = input.File()[0]["datapath"]
+			if path in self._rejected: return None
+			if self._size is not None and getsize(path) > self._size:
+				self.Reject(path, "The file is larger than {} bytes.".format(self._size))
+				return None
+
+			# Results streamed from the file are still keyed by Version(), so hash it now.
+			await self.Digest(input)
+			return Upload(path, self._rows)
+
+		if not Pyodide and exists(self.Source + input.Example()): return Upload(self.Source + input.Example())
+		data = await self.Download(self.Source + input.Example())
+		return BytesIO(data) if data is not None else None
+
+
+	async def Prime(self, n):
+		"""
+		@brief Ensures an example is downloaded and parsed.
+		@param n: The name of the example.
+		"""
+
+		# Examples are shared between sessions, unless the handler cannot allow it.
+		if not self._share:
+			if n not in self._primary: self._primary[n] = await self.Example(n)
+		elif (key := (self._project, n)) not in Shared:
+			if key not in Pending: Pending[key] = ensure_future(self.Example(n))
+			try: Shared[key] = await Pending[key]
+			finally: Pending.pop(key, None)
+
+
+	async def Prefetch(self, examples, resources = ()):
+		"""
+		@brief Concurrently downloads and parses examples, and downloads resources.
+		@param examples: The names of the examples, such as the keys passed to FileSelection()
+		@param resources: The URLs of any resources to Fetch()
+		@info Failures are ignored; the example will simply be loaded when selected.
+		"""
+		await gather(*[self.Prime(n) for n in examples], *[self.Fetch(url) for url in resources], return_exceptions=True)
+
+
+	def Warm(self, session, examples, resources = ()):
+		"""
+		@brief Prefetches examples and resources in the background, once the session has first been drawn.
+		@param session: The Shiny session.
+		@param examples: The names of the examples.
+		@param resources: The URLs of any resources to Fetch()
+		"""
+		session.on_flushed(lambda: ensure_future(self.Prefetch(examples, resources)), once=True)
+
+
+	async def Parse(self, n, path, name):
+		"""
+		@brief Parses an upload, reporting progress to the user.
+		@param n: The identifier of the upload.
+		@param path: The path to the upload.
+		@param name: The name of the file, to display.
+		@returns The DataFrame returned by the handler.
+		@info Natively, the handler runs on a worker thread so the session remains responsive, and the
+			event loop updates a progress bar as the file is read. Pyodide has no threads, so we parse directly.
+		"""
+		with Upload(path, self._rows) as file:
+			if Pyodide or get_current_session() is None: return self.Measure(n, file)
+			with ui.Progress() as progress:
+				progress.set(0, message="Parsing {}".format(name))
+				task = ensure_future(to_thread(self.Measure, n, file))
+				while not task.done():
+					await wait([task], timeout=0.25)
+					progress.set(min(file.Position / file.Size, 1))
+				df = task.result()
+			ui.notification_show("Parsed {}.{}".format(name, self.Peak(n)), type="message", duration=5)
+			return df
+
+
+	def Reject(self, path, reason):
+		"""
+		@brief Rejects an upload, notifying the user.
+		@param path: The path to the upload.
+		@param reason: Why it was rejected.
+		"""
+		self._rejected.add(path)
+		if get_current_session() is not None: ui.notification_show("Upload rejected: {}".format(reason), type="error")
+
+
+	@staticmethod
+	def Resident(restart = False):
+		"""
+		@brief Returns the resident memory of the process.
+		@param restart: Whether to restart the peak first, such that it only covers what follows. Only Linux allows it.
+		@returns The current and peak resident memory, in bytes, or None if the OS does not report them. Where the
+			peak cannot be restarted, it is returned as both, such that the difference of two calls is how far it grew.
+		"""
+		if Pyodide: return None
+		try:
+			if restart:
+				with open("/proc/self/clear_refs", "w") as refs: refs.write("5")
+			with open("/proc/self/status") as status: fields = dict(line.split(":", 1) for line in status if ":" in line)
+			return int(fields["VmRSS"].split()[0]) * 1024, int(fields["VmHWM"].split()[0]) * 1024
+		except (OSError, KeyError, ValueError): pass
+		if getrusage is None: return None
+		peak = getrusage(RUSAGE_SELF).ru_maxrss * (1 if platform == "darwin" else 1024)
+		return peak, peak
+
+
+	def Measure(self, n, i):
+		"""
+		@brief Calls the data handler, recording how far it grew the peak memory of the process in Peaks.
+		@param n: The name of the file.
+		@param i: The path, or binary, of the file.
+		@returns The DataFrame returned by the handler.
+		@info Parses run concurrently, so the figure is approximate: memory that other parses, or sessions, held at the
+			same time is charged to each of them, and where the peak cannot be restarted only growth past it is seen.
+		"""
+		token = object()
+		before = Cache.Resident(restart=not Measuring)
+		Measuring.add(token)
+		try: return self._handler(n, i)
+		finally:
+			Measuring.discard(token)
+			after = Cache.Resident()
+			if before is not None and after is not None: self.Peaks[n] = max(0, after[1] - before[0])
+
+
+	def Peak(self, n):
+		"""
+		@brief Describes the memory used to parse an upload, for the user.
+		@param n: The identifier of the upload.
+		@returns A sentence, or an empty string if it was not measured.
+		"""
+		if n not in self.Peaks: return ""
+		return " Parsing grew memory by about {:.1f} MB at its peak.".format(self.Peaks[n] / (1 << 20))
+
+
+	def Get(self, n):
+		"""
+		@brief Returns the immutable DataFrame for an identifier returned by N()
+		@param n: The identifier.
+		@returns The DataFrame, from either the shared or the session's primary cache.
+		"""
+		try: return Shared[(self._project, n)]
+		except KeyError: return self._primary[n]
+
+
+	async def Example(self, n):
+		"""
+		@brief Downloads and parses an example.
+		@param n: The name of the example file.
+		@returns The parsed DataFrame.
+		"""
+		if self._share and self._mapped is not None:
+			df = self.Restore(n)
+			if df is not None: return df
+			return self.Persist(n, self._handler(n, BytesIO(await self.Download(self.Source + n))))
+		return self._handler(n, BytesIO(await self.Download(self.Source + n)))
+
+
+	async def Fetch(self, url):
+		"""
+		@brief Downloads a static resource, such as a GeoJSON, once per worker.
+		@param url: The URL, or path, of the resource.
+		@returns The binary of the resource.
+		"""
+		if url not in Shared: Shared[url] = await self.Download(url)
+		return Shared[url]
+
+
+	async def Digest(self, input):
+		"""
+		@brief Returns Key(), hashing uploads natively on a worker thread so large files do not stall the session.
+		@param input: The Shiny input. See N() for required objects.
+		@returns The identifier, or None if the user has yet to upload a file.
+		"""
+		if input.SourceFile() == "Upload" and input.File() is not None:
+			path = input.File()[0]["datapath"]
+			if path not in self._digests:
+				digest = Cache.Hash(path) if Pyodide else await to_thread(Cache.Hash, path)
+				self._digests[path] = digest + Path(input.File()[0]["name"]).suffix.lower()
+		return self.Key(input)
+
+
+	def Key(self, input):
+		"""
+		@brief Returns the identifier of whatever the user has uploaded/selected, without loading it.
+		@param input: The Shiny input. See N() for required objects.
+		@returns The identifier, or None if the user has yet to upload a file.
+		@info Uploads are identified by the hash of their contents, followed by their suffix so that
+			handlers can still dispatch on it. Examples are identified by their name. N(), Open() and Digest()
+			hash uploads on a worker thread, so this only hashes on the event loop if called before any of them.
+		"""
 		if input.SourceFile() == "Upload":
 			file: list[FileInfo] | None = input.File()
 			if file is None: return None
-			n = file[0]["name"]
+			path = file[0]["datapath"]
+			if path not in self._digests: self._digests[path] = Cache.Hash(path) + Path(file[0]["name"]).suffix.lower()
+			return self._digests[path]
+		return input.Example()
 
-			# Populate the base cache, if we need to
-			if n not in self._primary: self._primary[n] = self._handler(n, read(file[0]["datapath"], "wb"))
 
-		else:
-			n = input.Example()
-			if n not in self._primary: self._primary[n] = self._handler(n, BytesIO(await self.Download(self.Source + n)))
-		if n not in self._secondary: self._secondary[n] = deepcopy(self._primary[n])
-		return n
+	def Restore(self, n):
+		"""
+		@brief Restores a parsed frame from the memory-mapped store, or a parsed upload from disk.
+		@param n: The identifier of the upload.
+		@returns The DataFrame, or None if it has not been persisted.
+		"""
+		if self._mapped is not None:
+			try:
+				if not (self._mapped / n).exists(): return None
+				df = Mapped.Load(self._mapped / n)
+				(self._mapped / n).touch()
+				return df
+			except Exception: return None
+
+		if self._directory is None: return None
+		path = self._directory / (n + ".parquet")
+		try:
+			if not path.exists(): return None
+			df = read_parquet(path)
+
+			# Mark it as used, such that Prune() keeps it.
+			path.touch()
+			return df
+		except Exception: return None
+
 
+	def Persist(self, n, df):
+		"""
+		@brief Persists a parsed frame, so that it need not be parsed again.
+		@param n: The identifier of the upload.
+		@param df: The parsed DataFrame.
+		@returns The DataFrame to cache; with the memory-mapped store, this is the mapped copy.
+		@info Not every DataFrame can be represented in Parquet (Such as mixed object columns). Those are
+			simply kept in memory.
+		"""
+		if self._mapped is not None:
+			try:
+				self._mapped.mkdir(parents=True, exist_ok=True)
+				if not (self._mapped / n).exists(): Mapped.Save(self._mapped / n, df)
+				df = Mapped.Load(self._mapped / n)
+			except Exception: return df
+
+			# Frames that are already mapped keep their pages even if pruned.
+			self.Prune()
+			return df
+
+		if self._directory is None: return df
+		path = self._directory / (n + ".parquet")
+		temporary = path.with_name("{}.{}.tmp".format(path.name, getpid()))
+		try:
+			self._directory.mkdir(parents=True, exist_ok=True)
+			df.to_parquet(temporary)
+			replace(temporary, path)
+			self.Prune()
+		except Exception: temporary.unlink(missing_ok=True)
+		return df
+
+
+	def Prune(self):
+		"""
+		@brief Removes the least recently used frames persisted to disk, or the memory-mapped store, until they fit within Disk.
+		@info Restore() touches the entries it reads, so their modification times order them by use. Entries removed by
+			another worker in the meantime are skipped.
+		"""
+		if self._mapped is not None: entries = [path for path in self._mapped.glob("*") if path.suffix != ".tmp"]
+		else: entries = list(self._directory.glob("*.parquet"))
 
-	def Cache(self): return self._secondary
+		files = []
+		for path in entries:
+			try:
+				status = path.stat()
+				size = sum(file.stat().st_size for file in path.iterdir()) if path.is_dir() else status.st_size
+			except OSError: continue
+			files.append((status.st_mtime, size, path))
+
+		total = sum(size for _, size, _ in files)
+		for _, size, path in sorted(files):
+			if total <= Disk: break
+			if path.is_dir(): rmtree(path, ignore_errors=True)
+			else: path.unlink(missing_ok=True)
+			total -= size
+
+
+	def Cache(self): return self._primary
+
+
+	def Version(self, input):
+		"""
+		@brief Returns the version of whatever the user has uploaded/selected.
+		@param input: The Shiny input. See N() for required objects.
+		@returns A hashable identifier that changes whenever the data is edited or reset, and can thus key
+			a cache of results computed from it.
+		"""
+		n = self.Key(input)
+		return n, self._versions.get(n, 0)
+
+
+	def Stats(self):
+		"""
+		@brief Returns the counters of the cache.
+		@returns A dictionary containing the Stats() of the primary and shared stores, the peak memory each
+			upload used to parse, and the amount of edited cells.
+		"""
+		return {"Primary": self._primary.Stats(), "Shared": Shared.Stats(), "Peaks": self.Peaks, "Edits": sum(len(rows) for edits in self._overlay.values() for rows in edits.values())}
 
 
 	async def Update(self, input):
 		"""
-		@brief Updates information within the secondary cache based on user selection
+		@brief Records an edit within the overlay based on user selection
 		@param input: The Shiny input. Importantly, these must be defined:
 			input.TableRow: The row to modify
 			input.TableCol: The column to modify
@@ -142,31 +1066,661 @@ class Cache:
 		"""
 
 		# Get the data
-		df = await self.Load(input)
-		row_count, column_count = df.shape
+		n = await self.N(input)
+		if n is None: return
+		row_count, column_count = self.Get(n).shape
 		row, column = input.TableRow(), input.TableCol()
 
 		# So long as row and column are sane, update.
 		if row < row_count and column < column_count:
 			match input.Type():
-				case "Integer": df.iloc[row, column] = int(input.TableVal())
-				case "Float": df.iloc[row, column] = float(input.TableVal())
-				case "String": df.iloc[row, column] = input.TableVal()
+				case "Integer": value = int(input.TableVal())
+				case "Float": value = float(input.TableVal())
+				case "String": value = input.TableVal()
+			self._overlay.setdefault(n, {}).setdefault(column, {})[row] = value
+			self._versions[n] = self._versions.get(n, 0) + 1
+			self._history.setdefault(n, []).append([(row, column)])
 
 
 	async def Purge(self, input):
 		"""
-		@brief Purges the secondary cache of whatever the user has uploaded/selected
+		@brief Purges the edits of whatever the user has uploaded/selected
 		@param input: The Shiny input. See N() for required objects.
 		@info This function should be called on a reactive hook for a "Reset" button.
 		"""
-		if input.SourceFile() == "Upload":
-			file: list[FileInfo] | None = input.File()
-			if file is None: return None
-			n = file[0]["name"]
-		else:
-			n = input.Example()
-		del self._secondary[n]
+		n = self.Key(input)
+		edits = self._overlay.pop(n, {})
+		self._versions[n] = self._versions.get(n, 0) + 1
+		self._history.setdefault(n, []).append([(row, column) for column, rows in edits.items() for row in rows])
+
+
+	def Changes(self, input, since):
+		"""
+		@brief Returns the cells that have been edited or reset since an earlier version.
+		@param input: The Shiny input. See N() for required objects.
+		@param since: A version, as returned by Version()
+		@returns A set of (row, column) positions, or None if since is not a version of the current data.
+		"""
+		n, version = self.Version(input)
+		if since[0] != n or since[1] > version: return None
+		return {cell for cells in self._history.get(n, [])[since[1]:version] for cell in cells}
+
+
+class Summary:
+	"""
+	@brief A fixed-size overview of a condensed matrix, binned from its rows as they are computed.
+	@info Each bin holds the sum, amount, and maximum of the cells of a block of rows and columns, such that the
+		whole matrix can be drawn by its mean or maximum without reading it again. Only the upper triangle is
+		binned, and mirrored when drawn.
+	"""
+
+	# The amount of bins along each side.
+	Size = 1024
+
+
+	def __init__(self, n):
+		"""
+		@brief Creates an empty summary.
+		@param n: The amount of rows and columns of the matrix.
+		"""
+		self.N = n
+		self.Edges = arange(min(n, Summary.Size)) * n // max(1, min(n, Summary.Size))
+		bins = len(self.Edges)
+		self.Sums, self.Counts, self.Maxima = zeros((bins, bins)), zeros((bins, bins), dtype=int64), full((bins, bins), -inf)
+		self.Lower, self.Upper = inf, -inf
+
+
+	@property
+	def nbytes(self): return self.Sums.nbytes + self.Counts.nbytes + self.Maxima.nbytes
+
+
+	@staticmethod
+	def Partial(distances, start, stop, n, edges):
+		"""
+		@brief Bins the distances of a range of rows.
+		@param distances: The distances, from Pool.Rows()
+		@param start: The first row.
+		@param stop: The row after the last.
+		@param n: The amount of rows and columns of the matrix.
+		@param edges: The first row, and column, of each bin.
+		@returns The first bin of the rows, and the sums, amounts, and maxima of their bins, and the smallest and
+			largest distance, to be merged by Merge()
+		@info NaNs, such as from observations that are all zero, are binned as 0, as they are drawn.
+		"""
+		distances = nan_to_num(distances)
+		rows = edges.searchsorted(arange(start, stop), side="right") - 1
+		first, shape = rows[0], (rows[-1] - rows[0] + 1, len(edges))
+		sums, counts, maxima = zeros(shape), zeros(shape, dtype=int64), full(shape, -inf)
+
+		offset = 0
+		for i, row in zip(range(start, stop), rows - first):
+			segment = distances[offset:offset + n - i - 1]
+			offset += len(segment)
+			if not len(segment): continue
+
+			# The row's distances begin partway through the bin of the column after it.
+			column = edges.searchsorted(i + 1, side="right") - 1
+			starts = concatenate([[0], edges[column + 1:] - i - 1])
+			sums[row, column:] += add.reduceat(segment, starts, dtype=float)
+			counts[row, column:] += diff(concatenate([starts, [len(segment)]]))
+			maxima[row, column:] = maximum(maxima[row, column:], maximum.reduceat(segment, starts))
+
+		lower, upper = (distances.min(), distances.max()) if len(distances) else (inf, -inf)
+		return first, sums, counts, maxima, lower, upper
+
+
+	@staticmethod
+	def From(distances, n):
+		"""
+		@brief Bins a finished condensed matrix.
+		@param distances: The condensed distances.
+		@param n: The amount of rows and columns of the matrix.
+		@returns The Summary.
+		@info Rows are binned about Block distances at a time, such that a memory-mapped matrix is read once, in order.
+		"""
+		summary = Summary(n)
+		before = arange(n + 1) * (n - 1) - arange(n + 1) * arange(-1, n) // 2
+		bounds = Pool.Bounds(n, max(1, ceil(len(distances) / Block)))
+		for start, stop in zip(bounds, bounds[1:]):
+			summary.Merge(Summary.Partial(distances[before[start]:before[stop]], start, stop, n, summary.Edges))
+		return summary
+
+
+	def Merge(self, partial):
+		"""
+		@brief Adds the bins of some rows, from Partial()
+		@param partial: The bins.
+		"""
+		first, sums, counts, maxima, lower, upper = partial
+		self.Sums[first:first + len(sums)] += sums
+		self.Counts[first:first + len(sums)] += counts
+		self.Maxima[first:first + len(sums)] = maximum(self.Maxima[first:first + len(sums)], maxima)
+		self.Lower, self.Upper = min(self.Lower, lower), max(self.Upper, upper)
+
+
+	def View(self, height, width, aggregate, diagonal = 0):
+		"""
+		@brief Draws the whole matrix at a size.
+		@param height: The amount of pixels down.
+		@param width: The amount of pixels across.
+		@param aggregate: Either "Mean" or "Max"
+		@param diagonal: The value of every cell along the diagonal.
+		@returns A numpy array of shape (height, width)
+		@info Each pixel aggregates the bins that begin within it, so its edges are only as exact as the bins.
+		"""
+		sizes = diff(concatenate([self.Edges, [self.N]]))
+		sums, counts, maxima = self.Sums + self.Sums.T, self.Counts + self.Counts.T, maximum(self.Maxima, self.Maxima.T)
+		sums[arange(len(sizes)), arange(len(sizes))] += diagonal * sizes
+		counts[arange(len(sizes)), arange(len(sizes))] += sizes
+		maxima[arange(len(sizes)), arange(len(sizes))] = maximum(maxima.diagonal(), diagonal)
+
+		# Where pixels outnumber bins, reduceat repeats each bin, rather than reducing those after it.
+		rows = self.Edges.searchsorted(arange(height) * self.N // height, side="right") - 1
+		columns = self.Edges.searchsorted(arange(width) * self.N // width, side="right") - 1
+		reduce = lambda values, function: function.reduceat(function.reduceat(values, rows, axis=0), columns, axis=1)
+		return reduce(sums, add) / reduce(counts, add) if aggregate == "Mean" else reduce(maxima, maximum)
+
+
+class Condensed:
+	"""
+	@brief A symmetric matrix, stored as the upper triangle that pdist returns.
+	@info The triangle is kept as float32, a quarter of the full matrix in float64, and cells are only expanded
+		for the rows and columns asked for, such as a block being drawn or downloaded. NaNs, such as from
+		observations that are all zero, are expanded as 0. The triangle may be memory-mapped.
+	"""
+
+	def __init__(self, values, labels = None, diagonal = 0, summary = None):
+		"""
+		@brief Holds a condensed matrix.
+		@param values: The upper triangle, as returned by pdist.
+		@param labels: The name of each row and column, if any.
+		@param diagonal: The value of every cell along the diagonal.
+		@param summary: A Summary of the triangle, from Pool.Distances(), if any.
+		"""
+		self.Values = asanyarray(values, dtype=float32)
+		self.Summary = summary
+
+		# No distances is ambiguous between none and one observation, which the labels settle.
+		self.N = int(round((1 + sqrt(1 + 8 * len(self.Values))) / 2)) if labels is None else len(labels)
+		self.Shape = (self.N, self.N)
+		self.Labels = list(range(self.N)) if labels is None else list(labels)
+		self.Diagonal = diagonal
+		self.Offsets = arange(self.N) * (2 * self.N - arange(self.N) - 3) // 2 - 1
+
+
+	@property
+	def nbytes(self): return Store.Size(self.Values) + (self.Summary.nbytes if self.Summary is not None else 0)
+
+
+	def Cells(self, rows, columns):
+		"""
+		@brief Expands some of the matrix.
+		@param rows: The rows, as an array of indices.
+		@param columns: The columns, as an array of indices.
+		@returns A float32 numpy array of shape (rows, columns)
+		"""
+		i, j = asarray(rows), asarray(columns)
+		if not len(self.Values): return full((len(i), len(j)), self.Diagonal, dtype=float32)
+
+		# Cell (a, b) of the upper triangle, where a < b, is at Offsets[a] + b.
+		offsets = self.Offsets[i][:, None] + j[None, :], self.Offsets[j][None, :] + i[:, None]
+		cells = nan_to_num(self.Values[where(j[None, :] > i[:, None], *offsets)], copy=False)
+		cells[i[:, None] == j[None, :]] = self.Diagonal
+		return cells
+
+
+	def Block(self, top, bottom, left, right):
+		"""
+		@brief Expands a rectangle of the matrix.
+		@param top: The first row.
+		@param bottom: The row after the last.
+		@param left: The first column.
+		@param right: The column after the last.
+		@returns A float32 numpy array of shape (bottom - top, right - left)
+		@info The cells of a row right of the diagonal are contiguous in the triangle, so are copied as one slice.
+			Only those left of it are gathered, from the rows above. This is several times faster than Cells().
+		"""
+		cells = empty((bottom - top, right - left), dtype=float32)
+		for row, i in enumerate(range(top, bottom)):
+			lower, upper = min(max(i, left), right), min(max(i + 1, left), right)
+			cells[row, :lower - left] = self.Values[self.Offsets[left:lower] + i]
+			cells[row, upper - left:] = self.Values[self.Offsets[i] + upper:self.Offsets[i] + right]
+			if lower < upper: cells[row, lower - left] = self.Diagonal
+		return nan_to_num(cells, copy=False)
+
+
+	def Rows(self, start, stop):
+		"""
+		@brief Expands a range of rows.
+		@param start: The first row.
+		@param stop: The row after the last.
+		@returns A float32 numpy array of shape (stop - start, N)
+		"""
+		return self.Block(start, stop, 0, self.N)
+
+
+	def Within(self, limit):
+		"""
+		@brief Finds the cells at most a limit.
+		@param limit: The limit.
+		@returns The rows, columns and values of those cells, in both triangles and along the diagonal.
+		"""
+		k = flatnonzero(self.Values <= limit)
+		i = (self.Offsets + arange(self.N) + 1).searchsorted(k, side="right") - 1
+		j = k - self.Offsets[i]
+		diagonal = arange(self.N) if self.Diagonal <= limit else arange(0)
+
+		rows, columns = concatenate([i, j, diagonal]), concatenate([j, i, diagonal])
+		return rows, columns, concatenate([self.Values[k], self.Values[k], full(len(diagonal), self.Diagonal, dtype=float32)])
+
+
+	def Dense(self):
+		"""
+		@brief Expands the whole matrix.
+		@returns A DataFrame, with the labels along both axes.
+		"""
+		return DataFrame(self.Rows(0, self.N), index=self.Labels, columns=self.Labels)
+
+
+class Pyramid:
+	"""
+	@brief A matrix, alongside progressively coarser copies of it, such that any region can be drawn from about as
+		many cells as it has pixels.
+	@info Level (i, j) aggregates blocks of 2^i rows by 2^j columns, by either their mean or their maximum. Levels are
+		built from the next finer one when first needed, and kept, so a level is only ever computed once. A Store
+		measures a Pyramid when it is inserted, so it should be inserted again once it has grown.
+		Sparse matrices stay sparse at every level, holding each cell less the fill, such that absent cells are zero.
+		Their levels are binned directly from the finest one, so they cost as much as it has stored cells.
+		Condensed matrices have no levels, as even one would be far larger than their triangle. Instead, each view
+		is aggregated from the cells of its region, a block of rows at a time, and kept. The whole matrix is drawn
+		from its Summary instead, if it has one.
+	"""
+
+	# The amount of views of a condensed matrix kept.
+	Views = 8
+
+	def __init__(self, values, rows = None, columns = None, aggregate = "Mean", fill = 0):
+		"""
+		@brief Builds the finest level of a pyramid.
+		@param values: The matrix, as a DataFrame, numpy array, SciPy sparse matrix, or Condensed matrix.
+		@param rows: The order of the rows, such as the leaves of a dendrogram, if any.
+		@param columns: The order of the columns, if any.
+		@param aggregate: Either "Mean" or "Max"
+		@param fill: The value of the cells a sparse matrix does not store.
+		"""
+		if isinstance(values, Condensed):
+			self.Levels, self.Shape, self.Aggregate, self.Sparse, self.Fill = {(0, 0): values}, values.Shape, aggregate, False, 0
+			self.Order = (rows, columns)
+			self.Regions = OrderedDict()
+
+			# A summary already knows the bounds, so a memory-mapped triangle need not be read for them.
+			bounds = (values.Summary.Lower, values.Summary.Upper) if values.Summary is not None else (nanmin(values.Values), nanmax(values.Values)) if len(values.Values) else (inf, -inf)
+			self.Lower, self.Upper = min(bounds[0], values.Diagonal), max(bounds[1], values.Diagonal)
+			return
+
+		self.Sparse = hasattr(values, "nnz")
+		values = values.tocsr().astype(float) if self.Sparse else asarray(values, dtype=float)
+		if rows is not None: values = values[rows]
+		if columns is not None: values = values[:, columns]
+
+		self.Levels = {(0, 0): values}
+		self.Shape = values.shape
+		self.Aggregate = aggregate
+		self.Fill = fill
+
+		if self.Sparse:
+			values.data -= fill
+			stored = values.data if values.nnz == self.Shape[0] * self.Shape[1] else concatenate([values.data, [0]])
+			self.Lower, self.Upper = nanmin(stored) + fill, nanmax(stored) + fill
+		else: self.Lower, self.Upper = nanmin(values), nanmax(values)
+
+
+	@property
+	def nbytes(self): return sum(Store.Size(level) for level in (*self.Levels.values(), *getattr(self, "Regions", {}).values()))
+
+
+	def Level(self, i, j):
+		"""
+		@brief Returns a level, building it if needed.
+		@param i: The level along the rows.
+		@param j: The level along the columns.
+		@returns The level, as a numpy array, or a CSR matrix for sparse pyramids.
+		"""
+		if (i, j) not in self.Levels and self.Sparse: self.Levels[(i, j)] = self.Bin(i, j)
+		if (i, j) not in self.Levels:
+			finer, axis = (self.Level(i - 1, j), 0) if i > 0 else (self.Level(i, j - 1), 1)
+
+			# Odd lengths repeat their last row or column, such that every block is a pair.
+			if finer.shape[axis] % 2: finer = concatenate([finer, finer.take([-1], axis=axis)], axis=axis)
+			first, second = (finer[0::2], finer[1::2]) if axis == 0 else (finer[:, 0::2], finer[:, 1::2])
+			self.Levels[(i, j)] = (first + second) / 2 if self.Aggregate == "Mean" else maximum(first, second)
+		return self.Levels[(i, j)]
+
+
+	def Bin(self, i, j):
+		"""
+		@brief Aggregates the stored cells of a sparse pyramid into a level.
+		@param i: The level along the rows.
+		@param j: The level along the columns.
+		@returns The level, as a CSR matrix.
+		"""
+		from scipy.sparse import csr_matrix, diags
+
+		finest = self.Levels[(0, 0)].tocoo()
+		shape = (ceil(self.Shape[0] / 2 ** i), ceil(self.Shape[1] / 2 ** j))
+		rows, columns = finest.row >> i, finest.col >> j
+
+		# The amount of cells within each block, as those along the edges may be cut short.
+		heights = minimum(2 ** i, self.Shape[0] - arange(shape[0]) * 2 ** i)
+		widths = minimum(2 ** j, self.Shape[1] - arange(shape[1]) * 2 ** j)
+
+		# Absent cells are zero, so the sum of a block over its amount of cells is its mean.
+		if self.Aggregate == "Mean":
+			return (diags(1 / heights) @ csr_matrix((finest.data, (rows, columns)), shape=shape) @ diags(1 / widths)).tocsr()
+		if not finest.nnz: return csr_matrix(shape)
+
+		order = lexsort((columns, rows))
+		rows, columns, data = rows[order], columns[order], finest.data[order]
+		starts = flatnonzero(concatenate([[True], (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])]))
+		counts = diff(concatenate([starts, [len(data)]]))
+		rows, columns, data = rows[starts], columns[starts], maximum.reduceat(data, starts)
+
+		# Blocks that do not store every cell also hold the fill, which is zero.
+		data = where(counts < heights[rows] * widths[columns], maximum(data, 0), data)
+		return csr_matrix((data, (rows, columns)), shape=shape)
+
+
+	def View(self, window, height, width):
+		"""
+		@brief Samples a region of the matrix to a size, from the coarsest level that still has a cell for every pixel.
+		@param window: The region, as (top, bottom, left, right) in rows and columns of the finest level.
+		@param height: The amount of pixels down.
+		@param width: The amount of pixels across.
+		@returns A numpy array of shape (height, width)
+		"""
+		if isinstance(self.Levels[(0, 0)], Condensed): return self.Region(window, height, width)
+
+		top, bottom, left, right = window
+		i = floor(log2((bottom - top) / height)) if bottom - top > height else 0
+		j = floor(log2((right - left) / width)) if right - left > width else 0
+		level = self.Level(i, j)
+
+		rows = ((top + (arange(height) + 0.5) * (bottom - top) / height) // 2 ** i).astype(int).clip(0, level.shape[0] - 1)
+		columns = ((left + (arange(width) + 0.5) * (right - left) / width) // 2 ** j).astype(int).clip(0, level.shape[1] - 1)
+		return level[rows][:, columns].toarray() + self.Fill if self.Sparse else level[rows][:, columns]
+
+
+	def Region(self, window, height, width):
+		"""
+		@brief Draws a region of a condensed matrix at a size, keeping the last few drawn.
+		@param window: The region, as (top, bottom, left, right) in rows and columns of the matrix.
+		@param height: The amount of pixels down.
+		@param width: The amount of pixels across.
+		@returns A numpy array of shape (height, width)
+		"""
+		key = (tuple(window), height, width)
+		if key not in self.Regions:
+			matrix = self.Levels[(0, 0)]
+
+			# The whole matrix is drawn from its summary, if it has one, rather than read again.
+			if matrix.Summary is not None and self.Order == (None, None) and tuple(window) == (0, matrix.N, 0, matrix.N):
+				self.Regions[key] = matrix.Summary.View(height, width, self.Aggregate, matrix.Diagonal)
+			else: self.Regions[key] = self.Expand(window, height, width)
+			if len(self.Regions) > Pyramid.Views: self.Regions.popitem(last=False)
+		return self.Regions[key]
+
+
+	def Expand(self, window, height, width):
+		"""
+		@brief Aggregates a region of a condensed matrix to a size.
+		@param window: The region, as (top, bottom, left, right) in rows and columns of the matrix.
+		@param height: The amount of pixels down.
+		@param width: The amount of pixels across.
+		@returns A numpy array of shape (height, width)
+		@info Each pixel aggregates the cells it covers. Rows are expanded a block of pixels at a time, such that only
+			about Block cells are ever held at once. Where there are fewer cells than pixels, each repeats its cell.
+		"""
+		top, bottom, left, right = window
+		matrix = self.Levels[(0, 0)]
+
+		# Where each pixel's cells begin and end, such that every pixel covers at least one cell.
+		def Bins(start, stop, pixels):
+			starts = start + arange(pixels) * (stop - start) // pixels
+			return starts, maximum(concatenate([starts[1:], [stop]]), starts + 1)
+		(row_starts, row_ends), (column_starts, column_ends) = Bins(top, bottom, height), Bins(left, right, width)
+
+		# Unordered regions are expanded as rectangles, which is far faster than gathering each cell.
+		rows, columns = self.Order
+		expand = lambda top, bottom: matrix.Block(top, bottom, left, right) if rows is None and columns is None else matrix.Cells(
+			(arange(matrix.N) if rows is None else rows)[top:bottom], (arange(matrix.N) if columns is None else columns)[left:right])
+
+		reduce = add.reduceat if self.Aggregate == "Mean" else maximum.reduceat
+		step = max(1, Block // ((right - left) * max(1, (bottom - top) // height)))
+
+		region = empty((height, width))
+		for first in range(0, height, step):
+			last = min(height, first + step)
+			cells = expand(row_starts[first], row_ends[last - 1])
+			cells = reduce(cells, column_starts - left, axis=1, dtype=float)
+			region[first:last] = reduce(cells, row_starts[first:last] - row_starts[first], axis=0)
+		if self.Aggregate == "Mean": region /= outer(row_ends - row_starts, column_ends - column_starts)
+		return region
+
+
+class Raster:
+	"""
+	@brief Draws heatmaps directly into an image.
+	@info MatPlotLib builds an artist for every tick label, and resamples the matrix at draw time, which for thousands
+		of rows takes far longer than computing the heatmap itself. Raster instead samples the matrix to the size of
+		the output, maps it through a colormap lookup table into an RGBA buffer, and draws only as many labels as fit.
+		The result is returned as a PIL Image, which render.plot encodes as a PNG.
+	"""
+
+	# The size of the image, in pixels, if the output's size is unknown.
+	Default = (1200, 1000)
+
+	# The color of dendrograms, and of text.
+	Ink = (0, 0, 0, 255)
+
+
+	@staticmethod
+	def Size():
+		"""
+		@brief Returns the size of the output currently being rendered.
+		@returns The width and height in device pixels, and the pixel ratio.
+		"""
+		try:
+			data = get_current_session().clientdata
+			ratio = data.pixelratio()
+			return int(data.output_width() * ratio), int(data.output_height() * ratio), ratio
+		except Exception: return Raster.Default + (1,)
+
+
+	@staticmethod
+	def Colors(values, cmap, lower, upper):
+		"""
+		@brief Maps a matrix through a colormap.
+		@param values: A two dimensional numpy array.
+		@param cmap: The name of a MatPlotLib colormap.
+		@param lower: The value mapped to the start of the colormap.
+		@param upper: The value mapped to the end of the colormap.
+		@returns An RGBA buffer of the same shape. Missing values are left transparent.
+		"""
+		from matplotlib import colormaps
+		table = (colormaps[cmap](linspace(0, 1, 256)) * 255).astype(uint8)
+
+		scaled = (values - lower) * (255 / (upper - lower) if upper > lower else 0)
+		missing = isnan(scaled)
+		scaled[missing] = 0
+		rgba = table[scaled.clip(0, 255).astype(uint8)]
+		rgba[missing] = 0
+		return rgba
+
+
+	@staticmethod
+	def Dendrogram(matrix, length, depth, window = None):
+		"""
+		@brief Draws a dendrogram, with its leaves along the rows and its root at the left.
+		@param matrix: A linkage matrix, from hierarchy.linkage.
+		@param length: The amount of pixels along the leaves.
+		@param depth: The amount of pixels from the leaves to the root.
+		@param window: The leaves to draw, as (start, stop) in the dendrogram's order, if not all of them.
+		@returns A boolean mask of the lines, of shape (length, depth).
+		@info Every merge is three axis-aligned lines: a leg from each child up to the merge height, and a bar between
+			the two. Lines are drawn by marking where each begins and ends, and taking the cumulative sum.
+		"""
+		from scipy.cluster.hierarchy import leaves_list
+
+		n = len(matrix) + 1
+		start, stop = window if window is not None else (0, n)
+		position, height = empty(2 * n - 1), zeros(2 * n - 1)
+		position[leaves_list(matrix)] = (arange(n) + 0.5 - start) * length / (stop - start)
+		for i, (a, b, h, _) in enumerate(matrix):
+			position[n + i] = (position[int(a)] + position[int(b)]) / 2
+			height[n + i] = h
+
+		children = matrix[:, :2].astype(int)
+		top = height[n:]
+		scale = (depth - 1) / top.max() if top.max() > 0 else 0
+
+		# The root is drawn at the left, so heights are measured from the right.
+		column = lambda h: (depth - 1 - h * scale).astype(int)
+		row = lambda p: p.clip(0, length - 1).astype(int)
+
+		# Legs outside the window are dropped, and bars are cut at its edges.
+		legs = zeros((length, depth + 1), dtype=int)
+		for child in (children[:, 0], children[:, 1]):
+			visible = (position[child] >= 0) & (position[child] < length)
+			add.at(legs, (row(position[child][visible]), column(top[visible])), 1)
+			add.at(legs, (row(position[child][visible]), column(height[child][visible]) + 1), -1)
+
+		bars = zeros((length + 1, depth), dtype=int)
+		first, last = position[children].min(axis=1), position[children].max(axis=1)
+		visible = (last >= 0) & (first < length)
+		add.at(bars, (row(first[visible]), column(top[visible])), 1)
+		add.at(bars, (row(last[visible]) + 1, column(top[visible])), -1)
+
+		return (legs.cumsum(axis=1)[:, :depth] > 0) | (bars.cumsum(axis=0)[:length] > 0)
+
+
+	@staticmethod
+	def Labels(draw, labels, length, width, font, size, column = False):
+		"""
+		@brief Draws as many labels along an axis as fit, skipping the rest.
+		@param draw: The ImageDraw to draw on. Labels are drawn down its left edge.
+		@param labels: The labels, one per row.
+		@param length: The amount of pixels the rows span.
+		@param width: The amount of pixels available to each label.
+		@param font: The font.
+		@param size: The height of the font, in pixels.
+		@param column: Whether the labels will be rotated as column labels, in which case they are right aligned.
+		"""
+		pitch = length / len(labels)
+		step = max(1, ceil(size * 1.2 / pitch))
+		for i in range(0, len(labels), step):
+			label = str(labels[i])
+			x = width - 2 - draw.textlength(label, font=font) if column else 2
+			draw.text((x, (i + 0.5) * pitch - size / 2), label, fill=Raster.Ink, font=font)
+
+
+	@staticmethod
+	def Order(linkage):
+		"""
+		@brief Returns the order of the leaves of a dendrogram.
+		@param linkage: A linkage matrix, or None.
+		@returns The order, or None if there is no linkage.
+		"""
+		from scipy.cluster.hierarchy import leaves_list
+		return None if linkage is None else leaves_list(linkage)
+
+
+	@staticmethod
+	def Heatmap(values, cmap, rows = None, columns = None, row_linkage = None, column_linkage = None, legend = False, text = 8, window = None):
+		"""
+		@brief Renders a heatmap.
+		@param values: The matrix, as a DataFrame or numpy array, or a Pyramid already ordered by the linkages.
+		@param cmap: The name of a MatPlotLib colormap.
+		@param rows: Labels drawn right of each row, if any.
+		@param columns: Labels drawn below each column, if any.
+		@param row_linkage: A linkage matrix to order the rows by, drawn as a dendrogram to the left.
+		@param column_linkage: A linkage matrix to order the columns by, drawn as a dendrogram above.
+		@param legend: Whether to draw a color bar below the heatmap.
+		@param text: The size of the labels, in points.
+		@param window: The region to draw, as (top, bottom, left, right) in the ordered matrix, if not all of it.
+		@returns A PIL Image. Its info["Geometry"] holds where the heatmap was drawn, for Zoom()
+		"""
+		from PIL import Image, ImageDraw, ImageFont
+
+		row_order, column_order = Raster.Order(row_linkage), Raster.Order(column_linkage)
+		if not isinstance(values, Pyramid): values = Pyramid(values, row_order, column_order)
+		window = window if window is not None else (0, values.Shape[0], 0, values.Shape[1])
+
+		width, height, ratio = Raster.Size()
+		size = max(1, round(text * ratio * 4 / 3))
+		try: font = ImageFont.load_default(size=size)
+		except TypeError: font = ImageFont.load_default()
+
+		# Reserve space around the heatmap for each feature. Only the longest label is measured, as there may be many.
+		measure = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+		margin = lambda labels: min(width // 4, int(measure.textlength(max(map(str, labels), key=len), font=font)) + 4)
+		left = width // 7 if row_linkage is not None else 0
+		top = height // 7 if column_linkage is not None else 0
+		right = margin(rows) if rows is not None else 0
+		bottom = margin(columns) if columns is not None else 0
+		bar = 2 * size + 8 if legend else 0
+		w, h = max(1, width - left - right), max(1, height - top - bottom - bar)
+
+		# Only the cells that become pixels are ever colored, drawn from the coarsest level that suffices.
+		lower, upper = values.Lower, values.Upper
+		canvas = full((height, width, 4), 255, dtype=uint8)
+		canvas[top:top + h, left:left + w] = Raster.Colors(values.View(window, h, w), cmap, lower, upper)
+
+		if row_linkage is not None:
+			canvas[top:top + h, :left][Raster.Dendrogram(row_linkage, h, left, window[0:2])] = Raster.Ink
+		if column_linkage is not None:
+			canvas[:top, left:left + w][Raster.Dendrogram(column_linkage, w, top, window[2:4]).T] = Raster.Ink
+		if legend:
+			canvas[height - bar:height - bar + size, left:left + w] = Raster.Colors(linspace(lower, upper, w)[None, :], cmap, lower, upper)
+
+		image = Image.fromarray(canvas, "RGBA")
+		image.info["Geometry"] = (left, top, w, h, window)
+		draw = ImageDraw.Draw(image)
+
+		if rows is not None:
+			if row_order is not None: rows = [rows[i] for i in row_order]
+			strip = Image.new("RGBA", (right, h), (255, 255, 255, 0))
+			Raster.Labels(ImageDraw.Draw(strip), rows[window[0]:window[1]], h, right, font, size)
+			image.alpha_composite(strip, (left + w, top))
+
+		# Column labels are drawn as rows, and rotated to read upwards.
+		if columns is not None:
+			if column_order is not None: columns = [columns[i] for i in column_order]
+			strip = Image.new("RGBA", (bottom, w), (255, 255, 255, 0))
+			Raster.Labels(ImageDraw.Draw(strip), columns[window[2]:window[3]], w, bottom, font, size, column=True)
+			image.alpha_composite(strip.rotate(90, expand=True), (left, top + h))
+
+		if legend:
+			for value, anchor in ((lower, left), (upper, left + w - draw.textlength("{:.3g}".format(upper), font=font))):
+				draw.text((anchor, height - bar + size + 2), "{:.3g}".format(value), fill=Raster.Ink, font=font)
+
+		return image
+
+
+	@staticmethod
+	def Zoom(geometry, brush):
+		"""
+		@brief Converts a brush over a heatmap drawn by Heatmap() into the region of the matrix it covers.
+		@param geometry: The info["Geometry"] of the image.
+		@param brush: The brush, in the image's pixels, as given by the output's brush input.
+		@returns The region, as (top, bottom, left, right), which can be passed as Heatmap()'s window.
+		"""
+		left, top, w, h, (r0, r1, c0, c1) = geometry
+		span = lambda start, stop, origin, pixels, low, high: (
+			min(stop - 1, max(start, floor(start + (low - origin) / pixels * (stop - start)))),
+			max(start + 1, min(stop, ceil(start + (high - origin) / pixels * (stop - start)))),
+		)
+		(r0, r1), (c0, c1) = span(r0, r1, top, h, brush["ymin"], brush["ymax"]), span(c0, c1, left, w, brush["xmin"], brush["xmax"])
+		return (r0, max(r0 + 1, r1), c0, max(c0 + 1, c1))
 
 
 def NavBar(current):